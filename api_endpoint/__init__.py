@@ -1,16 +1,74 @@
 # project/__init__.py
 import os
+import importlib
 from flask import Flask
-from .db import get_db
-from .logger import api_logger, rate_limit_logger
+
+# Submodules resolved on first attribute access (see __getattr__ below) so that
+# importing the package does not pull in oracledb, jwt, redis, etc. The logger
+# is lazy too: importing it opens the log files and starts their listener threads.
+_LAZY_SUBMODULES = (
+    'auth', 'auth_v2', 'books', 'books_v2', 'library', 'library_v2',
+    'users', 'users_v2', 'circuit_breaker', 'db', 'helper', 'metrics', 'logger',
+)
+
+
+def __getattr__(name):
+    """Lazily import heavy submodules the first time they are accessed."""
+    if name in _LAZY_SUBMODULES:
+        module = importlib.import_module(f'.{name}', __name__)
+        globals()[name] = module
+        return module
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _register_blueprints(app):
+    """Import and register each blueprint only when the app is being built."""
+    # Auth Blueprint (for /register, /login)
+    from . import auth
+    # All routes in auth.py will be prefixed with /api/v1
+    app.register_blueprint(auth.bp, url_prefix='/api/v1')
+    # All routes in auth_v2.py will be prefixed with /api/v2
+    from . import auth_v2
+    app.register_blueprint(auth_v2.bp, url_prefix='/api/v2')
+
+    # Users Blueprint (for /users/...)
+    from . import users
+    # All routes in users.py will be prefixed with /api/v1/users
+    app.register_blueprint(users.bp, url_prefix='/api/v1/users')
+    # All routes in users_v2.py will be prefixed with /api/v2/users
+    from . import users_v2
+    app.register_blueprint(users_v2.bp, url_prefix='/api/v2/users')
+
+    # Books Blueprint (for /books/...)
+    from . import books
+    # All routes in books.py will be prefixed with /api/v1/books
+    app.register_blueprint(books.bp, url_prefix='/api/v1/books')
+    from . import books_v2
+    # All routes in books_v2.py will be prefixed with /api/v2/books
+    app.register_blueprint(books_v2.bp, url_prefix='/api/v2/books')
+
+    # Library Blueprint (for /borrow, /return, ...)
+    from . import library
+    # All routes in library.py will be prefixed with /api/v1
+    app.register_blueprint(library.bp, url_prefix='/api/v1')
+    from . import library_v2
+    # All routes in library_v2.py will be prefixed with /api/v2
+    app.register_blueprint(library_v2.bp, url_prefix='/api/v2')
+
 
 def create_app(test_config=None):
     """Create and configure an instance of the Flask application."""
+    from .logger import api_logger
     app = Flask(__name__, instance_relative_config=True)
 
     # --- Configuration ---
     app.config.from_mapping(
         SECRET_KEY=os.environ.get('SECRET_KEY'),
+        # Book lists and borrow histories repeat the same keys on every row,
+        # so gzip at a moderate level shrinks them several times over cheaply
+        COMPRESS_MIMETYPES=['application/json'],
+        COMPRESS_ALGORITHM=['gzip'],
+        COMPRESS_LEVEL=4,
         # Add other app-wide configs here
     )
 
@@ -21,9 +79,17 @@ def create_app(test_config=None):
 
     if test_config:
         app.config.from_mapping(test_config)
+
+    # request.get_json() and dict return values go through orjson too
+    from .helper import OrjsonProvider
+    app.json = OrjsonProvider(app)
+
+    # --- Response compression (ETags are computed on the uncompressed body) ---
+    from flask_compress import Compress
+    Compress(app)
     
     # --- Initialize Prometheus Metrics ---
-    from .metrics import REGISTRY, record_request_start, record_request_end
+    from .metrics import REGISTRY, record_request_start, record_request_end, prebind_metrics
     from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
     
     @app.before_request
@@ -39,24 +105,30 @@ def create_app(test_config=None):
         record_request_end(response.status_code, endpoint)
         return response
     
-    # --- Initialize Rate Limiter with Redis ---
-    from flask_limiter import Limiter
-    from flask_limiter.util import get_remote_address
-    from redis import Redis
+    # --- Initialize Rate Limiter with Redis (one EVALSHA per request) ---
+    from .ratelimit import RateLimiter, get_remote_address
+    from redis import Redis, BlockingConnectionPool
     from flask import request
     
     redis_host = os.environ.get('REDIS_HOST', 'localhost')
     redis_port = int(os.environ.get('REDIS_PORT', 6379))
     redis_db = int(os.environ.get('REDIS_DB', 0))
+    redis_max_connections = int(os.environ.get('REDIS_MAX_CONNECTIONS', 32))
     
     try:
-        redis_client = Redis(
+        # One shared pool per worker; threads block (up to 1s) for a free
+        # connection instead of serializing on a single socket.
+        redis_pool = BlockingConnectionPool(
+            max_connections=redis_max_connections,
+            timeout=1,
             host=redis_host,
             port=redis_port,
             db=redis_db,
             decode_responses=True,
-            socket_connect_timeout=5
+            socket_connect_timeout=5,
+            health_check_interval=30
         )
+        redis_client = Redis(connection_pool=redis_pool)
         # Test connection
         redis_client.ping()
         api_logger.info(f"Connected to Redis at {redis_host}:{redis_port}")
@@ -64,12 +136,16 @@ def create_app(test_config=None):
         api_logger.error(f"Failed to connect to Redis: {e}")
         redis_client = None
     
-    limiter = Limiter(
-        app=app,
+    # Shared client for rate limiting, caching, etc. (None when Redis is down)
+    app.redis = redis_client
+
+    limiter = RateLimiter(
+        redis_client,
         key_func=get_remote_address,
-        storage_uri=f"redis://{redis_host}:{redis_port}/{redis_db}" if redis_client else None,
-        default_limits=["200 per day", "50 per hour"]
+        default_limits=["200 per day", "50 per hour"],
+        in_memory_fallback_enabled=True
     )
+    limiter.init_app(app)
     
     # Store limiter in app context
     app.limiter = limiter
@@ -91,43 +167,13 @@ def create_app(test_config=None):
     db.init_app(app)
 
     # --- Register Blueprints ---
-    
-    # Auth Blueprint (for /register, /login)
-    from . import auth
-    # All routes in auth.py will be prefixed with /api/v1
-    app.register_blueprint(auth.bp, url_prefix='/api/v1') 
-    # All routes in auth_v2.py will be prefixed with /api/v2
-    from . import auth_v2
-    app.register_blueprint(auth_v2.bp, url_prefix='/api/v2')
-
-    # Users Blueprint (for /users/...)
-    from . import users
-    # All routes in users.py will be prefixed with /api/v1/users
-    app.register_blueprint(users.bp, url_prefix='/api/v1/users')
-    # All routes in users_v2.py will be prefixed with /api/v2/users
-    from . import users_v2
-    app.register_blueprint(users_v2.bp, url_prefix='/api/v2/users')
-    
-    # Books Blueprint (for /books/...)
-    from . import books
-    # All routes in books.py will be prefixed with /api/v1/books
-    app.register_blueprint(books.bp, url_prefix='/api/v1/books')
-    from . import books_v2
-    # All routes in books_v2.py will be prefixed with /api/v2/books
-    app.register_blueprint(books_v2.bp, url_prefix='/api/v2/books')
-
-    # Library Blueprint (for /borrow, /return, ...)
-    from . import library
-    # All routes in library.py will be prefixed with /api/v1
-    app.register_blueprint(library.bp, url_prefix='/api/v1')
-    from . import library_v2
-    # All routes in library_v2.py will be prefixed with /api/v2
-    app.register_blueprint(library_v2.bp, url_prefix='/api/v2')
+    _register_blueprints(app)
 
     @app.route('/health')
     @limiter.exempt
     def health_check():
         """A simple health check endpoint."""
+        from .db import get_db
         db = get_db()
         api_logger.info("Health check called")
         return {"status": "ok"}, 200
@@ -141,4 +187,7 @@ def create_app(test_config=None):
             "circuit_breakers": get_breaker_status()
         }, 200
     
+    # Every route is registered now, so their metric children can be created
+    prebind_metrics(app)
+
     return app
\ No newline at end of file
@@ -1,11 +1,14 @@
 # project/auth.py
 import oracledb
-import jwt
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from flask import Blueprint, request, current_app, Response, url_for
-from werkzeug.security import generate_password_hash, check_password_hash
-from .db import get_db
-from .helper import * # Assumes helper.py is now in the same directory
+from .db import get_db, autocommit
+from .validation import decode_register, decode_login
+from .sql import SQL_REGISTER_USER, SQL_LOGIN_USER
+from .passwords import DUMMY_HASH, hash_password, verify_password
+from .tokens import issue_token
+from .cache import invalidate_user_pages
+from .helper import create_response, rows_to_dicts
 
 # Create a Blueprint. 'auth' is the name, __name__ is the import name.
 bp = Blueprint('auth_v2', __name__)
@@ -13,22 +16,19 @@ bp = Blueprint('auth_v2', __name__)
 @bp.route('/register', methods=['POST'])
 def register():
     """Registers a new user."""
-    data = request.get_json()
-    if not data or not all(k in data for k in ('name', 'email', 'password')):
-        return create_response({"error": "Missing name, email, or password"}, 400)
+    registration, error = decode_register(request.get_data())
+    if error:
+        return create_response({"error": error}, 400)
 
-    name = data['name']
-    email = data['email']
-    hashed_password = generate_password_hash(data['password'], method='pbkdf2:sha256')
+    name, email, password = registration
+    hashed_password = hash_password(password)
 
     db = get_db()
     try:
         with db.cursor() as cursor:
-            cursor.execute(
-                'INSERT INTO users (name, email, password_hash) VALUES (:1, :2, :3)',
-                (name, email, hashed_password)
-            )
-            db.commit()
+            with autocommit(db):
+                cursor.execute(SQL_REGISTER_USER, (name, email, hashed_password))
+        invalidate_user_pages()
     except oracledb.IntegrityError as e:
         db.rollback()
         return create_response({"error": f"Database Integrity Error: {e}"}, 409)
@@ -42,35 +42,28 @@ def register():
 @bp.route('/login', methods=['POST'])
 def login():
     """Logs in a user and returns a JWT."""
-    data = request.get_json()
-    if not data or not all(k in data for k in ('email', 'password')):
-        return create_response({"error": "Missing email or password"}, 400)
+    credentials, error = decode_login(request.get_data())
+    if error:
+        return create_response({"error": error}, 400)
 
-    email = data['email']
-    password = data['password']
+    email, password = credentials
     db = get_db()
 
     with db.cursor() as cursor:
-        cursor.execute('SELECT id, password_hash FROM users WHERE email = :1', (email,))
+        cursor.execute(SQL_LOGIN_USER, (email,))
         user_list = rows_to_dicts(cursor)
 
-    if not user_list:
-        return create_response({"message": "Authentication failed"}, 401)
-    
-    user = user_list[0]
-
-    if check_password_hash(user['password_hash'], password):
+    stored_hash = user_list[0]['password_hash'] if user_list else DUMMY_HASH
+    if verify_password(stored_hash, password) and user_list:
+        user = user_list[0]
+        now = datetime.now(timezone.utc)
         payload = {
-            'exp': datetime.utcnow() + timedelta(hours=24),
-            'iat': datetime.utcnow(),
+            'exp': now + timedelta(hours=24),
+            'iat': now,
             'sub': str(user['id'])
         }
-        token = jwt.encode(
-            payload,
-            # Use current_app to access app config from within a blueprint
-            current_app.config['SECRET_KEY'],
-            algorithm='HS256'
-        )
+        # Signed with SECRET_KEY from current_app, using a pre-keyed HMAC
+        token = issue_token(payload)
         return create_response({'token': token}, 200,)
 
     return create_response({"message": "Authentication failed"}, 401)
\ No newline at end of file
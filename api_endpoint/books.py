@@ -1,11 +1,15 @@
 # project/books.py
 import oracledb
 import hashlib
-import json
-from flask import Blueprint, request, Response, url_for
+import orjson
+from flask import Blueprint, request, Response
 from math import ceil
-from .db import get_db
-from .helper import * # Assumes helper.py is now in the same directory
+from .db import get_db, autocommit
+from .validation import decode_book, decode_book_patch
+from .sql import SQL_GET_BOOK, SQL_COUNT_BOOKS, SQL_LIST_BOOKS_JSON, SQL_INSERT_BOOK, SQL_UPDATE_BOOK, SQL_DELETE_BOOK
+from .cache import (get_cached_etag, cache_etag, get_cached_book, cache_book, get_cached_book_page,
+                    cache_book_page, invalidate_book, invalidate_book_pages, invalidate_history)
+from .helper import create_response, create_body_response, body_etag, etag_response, rows_to_dicts, page_url, url_template, resource_headers, matched_etag, not_modified, add_book_links, log_request
 from .logger import api_logger
 
 bp = Blueprint('books', __name__)
@@ -22,44 +26,55 @@ def get_all_books():
     except ValueError:
         return create_response({"error": "Invalid 'page' or 'pageSize'. Must be positive integers."}, 400)
 
+    header = {'Cache-Control': 'public, max-age=300'}
+    page_field = f"v1:{page}:{limit}"
+    cached = get_cached_book_page(page_field)
+    if cached:
+        etag, body = cached
+        return etag_response(body, etag, header)
+
     offset = (page - 1) * limit
     db = get_db()
     
     try:
+        self_prefix, self_suffix = url_template('books.get_book_by_id', 'book_id').split('{}')
         with db.cursor() as cursor:
-            cursor.execute('SELECT COUNT(*) FROM books')
-            total_items = cursor.fetchone()[0]
-            if total_items == 0:
-                return create_response({'data': [], 'total_items': 0}, 200)
-
-            total_pages = ceil(total_items / limit)
-            query = """
-                SELECT * FROM books 
-                ORDER BY id 
-                OFFSET :offset ROWS FETCH NEXT :limit ROWS ONLY
-            """
-            cursor.execute(query, {'offset': offset, 'limit': limit})
-            books = rows_to_dicts(cursor)
-            
-            # This helper MUST be updated. See notes below.
-            books = [add_book_links(book) for book in books]
-
-            response_data = {
-                'total_items': total_items,
-                'total_pages': total_pages,
-                'current_page': page,
-                'data': books
-            }
-            
-            # url_for MUST be namespaced: 'books.get_all_books'
-            if page < total_pages:
-                response_data['next_page_url'] = url_for('books.get_all_books', page=page + 1, limit=limit, _external=True)
-            if page > 1:
-                response_data['prev_page_url'] = url_for('books.get_all_books', page=page - 1, limit=limit, _external=True)
-
-            header = {'Cache-Control': 'public, max-age=300'}
-            return create_response(response_data, 200, header)
-            
+            cursor.execute(SQL_LIST_BOOKS_JSON, {
+                'self_prefix': self_prefix, 'self_suffix': self_suffix,
+                'collection_url': url_template('books.get_all_books'),
+                'borrow_url': url_template('library.borrow_book'),
+                'offset': offset, 'limit': limit
+            })
+            # fetch_lobs is off, so the CLOB arrives as a str with the row
+            data_json, total_items = cursor.fetchone()
+            if total_items is None:
+                # Past the last page (or no books at all): count separately
+                cursor.execute(SQL_COUNT_BOOKS)
+                total_items = cursor.fetchone()[0]
+        if total_items == 0:
+            return create_response({'data': [], 'total_items': 0}, 200)
+
+        total_pages = ceil(total_items / limit)
+        response_data = {
+            'total_items': total_items,
+            'total_pages': total_pages,
+            'current_page': page
+        }
+
+        # Endpoint names MUST be namespaced: 'books.get_all_books'
+        page_links = {}
+        if page < total_pages:
+            page_links['next_page_url'] = page_url('books.get_all_books', page=page + 1, limit=limit)
+        if page > 1:
+            page_links['prev_page_url'] = page_url('books.get_all_books', page=page - 1, limit=limit)
+
+        # Splice Oracle's array into the envelope instead of decoding and re-encoding it
+        body = (orjson.dumps(response_data)[:-1] + b',"data":' + (data_json or '[]').encode('utf-8')
+                + (b',' + orjson.dumps(page_links)[1:] if page_links else b'}'))
+        etag = body_etag(body)
+        cache_book_page(page_field, etag, body.decode('utf-8'))
+        return etag_response(body, etag, header)
+
     except oracledb.Error as e:
         return create_response({"error": f"Database error: {e}"}, 500)
 
@@ -68,24 +83,44 @@ def get_all_books():
 @log_request
 def get_book_by_id(book_id):
     """Fetches a single book by its ID."""
+    # Revalidation only needs the small ETag key; otherwise serve the cached
+    # body. Either way a cache hit never touches Oracle or the pool.
+    if 'If-None-Match' in request.headers:
+        matched = matched_etag(get_cached_etag(book_id))
+        if matched:
+            return not_modified(matched)
+    cached = get_cached_book(book_id)
+    if cached:
+        etag, body = cached
+        matched = matched_etag(etag)
+        if matched:
+            return not_modified(matched)
+        return create_body_response(body, 200, resource_headers(etag))
+
     db = get_db()
     with db.cursor() as cursor:
-        cursor.execute('SELECT * FROM books WHERE id = :1', (book_id,))
+        cursor.execute(SQL_GET_BOOK, (book_id,))
         book_list = rows_to_dicts(cursor)
     if not book_list:
         return create_response({"error": "Book not found"}, 404)
-    
-    # This helper MUST be updated. See notes below.
-    book = add_book_links(book_list[0])
 
-    book_json_str = json.dumps(book, sort_keys=True).encode('utf-8')
-    etag = hashlib.sha1(book_json_str).hexdigest()
+    # The ETag only depends on the id and the row's SCN, so an unchanged
+    # book is answered with 304 before any links or JSON are built.
+    book = book_list[0]
+    etag_src = f"{book_id}:{book.pop('ora_rowscn')}".encode('utf-8')
+    etag = hashlib.blake2b(etag_src, digest_size=16).hexdigest()
+
+    matched = matched_etag(etag)
+    if matched:
+        cache_etag(book_id, etag)
+        return not_modified(matched)
 
-    if request.headers.get('If-None-Match') == etag:
-        return Response(status=304)
+    book = add_book_links(book)
+    book_json_str = orjson.dumps(book, option=orjson.OPT_SORT_KEYS)
+    cache_book(book_id, etag, book_json_str.decode('utf-8'))
 
-    headers = {'ETag': etag}
-    return create_response(book, 200, headers)
+    headers = resource_headers(etag)
+    return create_body_response(book_json_str, 200, headers)
 
 
 @bp.route('', methods=['POST'])
@@ -93,25 +128,19 @@ def get_book_by_id(book_id):
 def add_book():
     """Adds a new book to the library."""
     # ... (code for add_book is identical, no changes needed)
-    data = request.get_json()
-    if not data or not all(k in data for k in ('title', 'author', 'quantity')):
-        return create_response({"error": "Missing required fields: title, author, quantity"}, 400)
-
-    try:
-        title = data['title']
-        author = data['author']
-        quantity = int(data['quantity'])
-    except (ValueError, TypeError):
-        return create_response({"error": "Invalid data types for fields"}, 400)
+    book, error = decode_book(request.get_data())
+    if error:
+        return create_response({"error": error}, 400)
+    title, author, quantity = book
 
     db = get_db()
     try:
         with db.cursor() as cursor:
             new_id_var = cursor.var(oracledb.DB_TYPE_NUMBER)
-            sql = 'INSERT INTO books (title, author, quantity) VALUES (:1, :2, :3) RETURNING id INTO :4'
-            cursor.execute(sql, (title, author, quantity, new_id_var))
+            with autocommit(db):
+                cursor.execute(SQL_INSERT_BOOK, (title, author, quantity, new_id_var))
             new_book_id = int(new_id_var.getvalue()[0])
-            db.commit()
+        invalidate_book_pages()
 
         new_book = {"id": new_book_id, "title": title, "author": author, "quantity": quantity}
         return create_response(new_book, 201)
@@ -125,33 +154,40 @@ def add_book():
 def update_book(book_id):
     """Updates an existing book's details."""
     # ... (code for update_book is identical, no changes needed)
-    db = get_db()
-    book_to_update = db.cursor()
-    book_to_update.execute('SELECT * FROM books WHERE id = :1', (book_id,))
-    existing_book_data = rows_to_dicts(book_to_update)
-    book_to_update.close()
-
-    if not existing_book_data:
-        return create_response({"error": "Book not found"}, 404)
-
-    data = request.get_json()
-    if not data:
+    changes, error = decode_book_patch(request.get_data())
+    if error:
+        return create_response({"error": error}, 400)
+    if all(value is None for value in changes):
         return create_response({"error": "Request body cannot be empty"}, 400)
+    title, author, quantity = changes
 
-    title = data.get('title', existing_book_data[0]['title'])
-    author = data.get('author', existing_book_data[0]['author'])
-    quantity = data.get('quantity', existing_book_data[0]['quantity'])
-
-    with db.cursor() as cursor:
-        cursor.execute('UPDATE books SET title = :1, author = :2, quantity = :3 WHERE id = :4',
-                       (title, author, quantity, book_id))
-    db.commit()
-
-    with db.cursor() as cursor:
-        cursor.execute('SELECT * FROM books WHERE id = :1', (book_id,))
-        updated_book = rows_to_dicts(cursor)[0]
-
-    return create_response(updated_book, 200)
+    # Fields left out of the body are passed as NULL so COALESCE keeps the
+    # current value; RETURNING hands back the updated row in the same round-trip.
+    db = get_db()
+    try:
+        with db.cursor() as cursor:
+            title_var = cursor.var(oracledb.DB_TYPE_VARCHAR)
+            author_var = cursor.var(oracledb.DB_TYPE_VARCHAR)
+            quantity_var = cursor.var(oracledb.DB_TYPE_NUMBER)
+            with autocommit(db):
+                cursor.execute(SQL_UPDATE_BOOK, (title, author, quantity,
+                                                 book_id, title_var, author_var, quantity_var))
+            if cursor.rowcount == 0:
+                return create_response({"error": "Book not found"}, 404)
+        invalidate_book(book_id)
+        invalidate_history()
+
+        quantity = quantity_var.getvalue()[0]
+        updated_book = {
+            "id": book_id,
+            "title": title_var.getvalue()[0],
+            "author": author_var.getvalue()[0],
+            "quantity": int(quantity) if quantity is not None else None
+        }
+        return create_response(updated_book, 200)
+    except oracledb.Error as e:
+        db.rollback()
+        return create_response({"error": f"Database error: {e}"}, 500)
 
 
 @bp.route('/<int:book_id>', methods=['DELETE'])
@@ -161,8 +197,10 @@ def delete_book(book_id):
     # ... (code for delete_book is identical, no changes needed)
     db = get_db()
     with db.cursor() as cursor:
-        cursor.execute('DELETE FROM books WHERE id = :1', (book_id,))
+        with autocommit(db):
+            cursor.execute(SQL_DELETE_BOOK, (book_id,))
         if cursor.rowcount == 0:
             return create_response({"error": "Book not found"}, 404)
-    db.commit()
+    invalidate_book(book_id)
+    invalidate_history()
     return create_response({"message": f"Book with id {book_id} has been deleted."}, 200)
\ No newline at end of file
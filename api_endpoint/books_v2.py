@@ -1,13 +1,72 @@
 import oracledb
 import hashlib
-import json
-from flask import Blueprint, request, Response, url_for
+import orjson
+from flask import Blueprint, request, Response
 from math import ceil
-from .db import get_db
-from .helper import * # Assumes helper.py is now in the same directory
+from .db import get_db, autocommit
+from .validation import decode_book, decode_books, decode_book_patch
+from .sql import BOOK_COLUMNS, SQL_GET_BOOK, SQL_INSERT_BOOK, SQL_UPDATE_BOOK, SQL_DELETE_BOOK
+from .cache import (get_cached_etag, cache_etag, get_cached_book, cache_book, get_cached_book_page,
+                    cache_book_page, invalidate_book, invalidate_book_pages, invalidate_history)
+from .helper import create_response, create_body_response, rows_etag, list_not_modified, etag_response, rows_to_dicts, fetch_counted_page, tuned_cursor, page_url, resource_headers, matched_etag, not_modified, add_book_links
 
 bp = Blueprint('books_v2', __name__)
 
+
+def _supports_pipelining(db):
+    """Pipelining needs python-oracledb 2.4+ in thin mode."""
+    return hasattr(oracledb, 'create_pipeline') and getattr(db, 'thin', False)
+
+
+def _fetch_page_pipelined(db, where_sql, bind_params, data_params, limit):
+    """Sends the COUNT and the page query together so their round-trips overlap."""
+    pipeline = oracledb.create_pipeline()
+    pipeline.add_fetchone(f"SELECT COUNT(*) FROM books {where_sql}", bind_params)
+    pipeline.add_fetchall(f"""
+        SELECT {BOOK_COLUMNS} FROM books
+        {where_sql}
+        ORDER BY id
+        OFFSET :offset ROWS FETCH NEXT :limit ROWS ONLY
+    """, data_params, arraysize=limit)
+    count_result, page_result = db.run_pipeline(pipeline)
+
+    columns = [col.name.lower() for col in page_result.columns]
+    books = [dict(zip(columns, row)) for row in page_result.rows]
+    return count_result.rows[0][0], books
+
+
+def _fetch_page(db, where_sql, bind_params, data_params, limit):
+    """Fetches the page and the filtered total with a single windowed query."""
+    # Sized to the page so the rows arrive with the execute round-trip
+    with tuned_cursor(db, limit) as cursor:
+        data_query = f"""
+            SELECT {BOOK_COLUMNS}, COUNT(*) OVER () AS total_items FROM books
+            {where_sql}
+            ORDER BY id 
+            OFFSET :offset ROWS FETCH NEXT :limit ROWS ONLY
+        """
+        return fetch_counted_page(cursor, data_query, data_params,
+                                  f"SELECT COUNT(*) FROM books {where_sql}", bind_params)
+
+
+def _fetch_after(db, where_sql, bind_params, after_id, limit):
+    """Seeks past after_id on the primary key instead of skipping OFFSET rows."""
+    seek_sql = f"{where_sql} AND id > :after_id" if where_sql else "WHERE id > :after_id"
+    params = bind_params.copy()
+    params['after_id'] = after_id
+    # One extra row tells us whether a next page exists without a COUNT
+    params['limit'] = limit + 1
+    with tuned_cursor(db, limit + 1) as cursor:
+        cursor.execute(f"""
+            SELECT {BOOK_COLUMNS} FROM books
+            {seek_sql}
+            ORDER BY id
+            FETCH NEXT :limit ROWS ONLY
+        """, params)
+        books = rows_to_dicts(cursor)
+    return books[:limit], len(books) > limit
+
+
 @bp.route('', methods=['GET'])
 def get_all_books():
     """
@@ -18,6 +77,8 @@ def get_all_books():
     - author: Filter by author name (case-insensitive, partial match)
     - page: The page number (default 1)
     - limit: The number of items per page (default 10)
+    - after_id: Return books with an id greater than this (keyset pagination,
+      replaces page and skips the total count)
     """
     try:
         # --- Pagination ---
@@ -28,6 +89,15 @@ def get_all_books():
     except ValueError:
         return create_response({"error": "Invalid 'page' or 'limit'. Must be positive integers."}, 400)
 
+    after_id = request.args.get('after_id')
+    if after_id is not None:
+        try:
+            after_id = int(after_id)
+            if after_id < 0:
+                raise ValueError
+        except ValueError:
+            return create_response({"error": "Invalid 'after_id'. Must be a non-negative integer."}, 400)
+
     offset = (page - 1) * limit
 
     # --- Search / Filtering ---
@@ -50,63 +120,77 @@ def get_all_books():
     if where_clauses:
         where_sql = "WHERE " + " AND ".join(where_clauses) 
 
+    data_params = bind_params.copy()
+    data_params['offset'] = offset
+    data_params['limit'] = limit
+
+    header = {'Cache-Control': 'public, max-age=300'}
+    # Encoded as a JSON list so filter values containing separators can't collide
+    page_field = orjson.dumps(['v2', page, limit, after_id, title_search, author_search]).decode('utf-8')
+    cached = get_cached_book_page(page_field)
+    if cached:
+        etag, body = cached
+        return etag_response(body, etag, header)
+
     db = get_db()
     try:
-        with db.cursor() as cursor:
-            # --- Get Total Count (with filtering) ---
-            # The WHERE clause is applied to the count query
-            count_query = f"SELECT COUNT(*) FROM books {where_sql}"
-            cursor.execute(count_query, bind_params)
-            
-            total_items = cursor.fetchone()[0]
-            if total_items == 0:
-                return create_response({'data': [], 'total_items': 0, 'current_page': page, 'total_pages': 0}, 200)
-
-            total_pages = ceil(total_items / limit)
-
-            # --- Get Paginated Data (with filtering) ---
-            # Add pagination parameters to the bind list
-            data_params = bind_params.copy()
-            data_params['offset'] = offset
-            data_params['limit'] = limit
-
-            # The WHERE clause is also applied to the main data query
-            data_query = f"""
-                SELECT * FROM books 
-                {where_sql}
-                ORDER BY id 
-                OFFSET :offset ROWS FETCH NEXT :limit ROWS ONLY
-            """
-            cursor.execute(data_query, data_params)
-            
-            books = rows_to_dicts(cursor)
-            books = [add_book_links(book) for book in books]
-
-            # --- Build Response ---
-            response_data = {
-                'total_items': total_items,
-                'total_pages': total_pages,
-                'current_page': page,
-                'data': books
-            }
-            
-            # --- Pagination Links (with search params) ---
-            # Must pass the search params to url_for so they are preserved
-            # on the next/prev page links.
-            if page < total_pages:
-                response_data['next_page_url'] = url_for('books_v2.get_all_books', 
-                    page=page + 1, limit=limit, 
-                    title=title_search, author=author_search, 
-                    _external=True)
-            if page > 1:
-                response_data['prev_page_url'] = url_for('books_v2.get_all_books', 
-                    page=page - 1, limit=limit, 
-                    title=title_search, author=author_search, 
-                    _external=True)
-
-            header = {'Cache-Control': 'public, max-age=300'}
-            return create_response(response_data, 200, header)
-            
+        if after_id is not None:
+            books, has_more = _fetch_after(db, where_sql, bind_params, after_id, limit)
+            # Links follow from the rows, so a client holding this page gets its 304 before they are built
+            etag = rows_etag(page_field, has_more, books)
+            unchanged = list_not_modified(etag, header)
+            if unchanged:
+                return unchanged
+            response_data = {'data': [add_book_links(book) for book in books]}
+            if has_more:
+                response_data['next_page_url'] = page_url('books_v2.get_all_books',
+                    after_id=books[-1]['id'], limit=limit,
+                    title=title_search, author=author_search)
+            body = orjson.dumps(response_data)
+            cache_book_page(page_field, etag, body.decode('utf-8'))
+            return etag_response(body, etag, header)
+
+        if _supports_pipelining(db):
+            total_items, books = _fetch_page_pipelined(db, where_sql, bind_params, data_params, limit)
+        else:
+            total_items, books = _fetch_page(db, where_sql, bind_params, data_params, limit)
+
+        if total_items == 0:
+            return create_response({'data': [], 'total_items': 0, 'current_page': page, 'total_pages': 0}, 200)
+
+        total_pages = ceil(total_items / limit)
+
+        etag = rows_etag(page_field, total_items, books)
+        unchanged = list_not_modified(etag, header)
+        if unchanged:
+            return unchanged
+
+        books = [add_book_links(book) for book in books]
+
+        # --- Build Response ---
+        response_data = {
+            'total_items': total_items,
+            'total_pages': total_pages,
+            'current_page': page,
+            'data': books
+        }
+        
+        # --- Pagination Links (with search params) ---
+        # Must pass the search params to page_url so they are preserved
+        # on the next/prev page links.
+        if page < total_pages:
+            response_data['next_page_url'] = page_url('books_v2.get_all_books', 
+                page=page + 1, limit=limit, 
+                title=title_search, author=author_search)
+        if page > 1:
+            response_data['prev_page_url'] = page_url('books_v2.get_all_books', 
+                page=page - 1, limit=limit, 
+                title=title_search, author=author_search)
+
+        body = orjson.dumps(response_data)
+        cache_book_page(page_field, etag, body.decode('utf-8'))
+        return etag_response(body, etag, header)
+        
     except oracledb.Error as e:
         return create_response({"error": f"Database error: {e}"}, 500)
 
@@ -114,47 +198,62 @@ def get_all_books():
 @bp.route('/<int:book_id>', methods=['GET'])
 def get_book_by_id(book_id):
     """Fetches a single book by its ID."""
+    # Revalidation only needs the small ETag key; otherwise serve the cached
+    # body. Either way a cache hit never touches Oracle or the pool.
+    if 'If-None-Match' in request.headers:
+        matched = matched_etag(get_cached_etag(book_id))
+        if matched:
+            return not_modified(matched)
+    cached = get_cached_book(book_id)
+    if cached:
+        etag, body = cached
+        matched = matched_etag(etag)
+        if matched:
+            return not_modified(matched)
+        return create_body_response(body, 200, resource_headers(etag))
+
     db = get_db()
     with db.cursor() as cursor:
-        cursor.execute('SELECT * FROM books WHERE id = :1', (book_id,))
+        cursor.execute(SQL_GET_BOOK, (book_id,))
         book_list = rows_to_dicts(cursor)
     if not book_list:
         return create_response({"error": "Book not found"}, 404)
-    
-    book = add_book_links(book_list[0])
 
-    book_json_str = json.dumps(book, sort_keys=True).encode('utf-8')
-    etag = hashlib.sha1(book_json_str).hexdigest()
+    # The ETag only depends on the id and the row's SCN, so an unchanged
+    # book is answered with 304 before any links or JSON are built.
+    book = book_list[0]
+    etag_src = f"{book_id}:{book.pop('ora_rowscn')}".encode('utf-8')
+    etag = hashlib.blake2b(etag_src, digest_size=16).hexdigest()
 
-    if request.headers.get('If-None-Match') == etag:
-        return Response(status=304)
+    matched = matched_etag(etag)
+    if matched:
+        cache_etag(book_id, etag)
+        return not_modified(matched)
 
-    headers = {'ETag': etag}
-    return create_response(book, 200, headers)
+    book = add_book_links(book)
+    book_json_str = orjson.dumps(book, option=orjson.OPT_SORT_KEYS)
+    cache_book(book_id, etag, book_json_str.decode('utf-8'))
+
+    headers = resource_headers(etag)
+    return create_body_response(book_json_str, 200, headers)
 
 
 @bp.route('', methods=['POST'])
 def add_book():
     """Adds a new book to the library."""
-    data = request.get_json()
-    if not data or not all(k in data for k in ('title', 'author', 'quantity')):
-        return create_response({"error": "Missing required fields: title, author, quantity"}, 400)
-
-    try:
-        title = data['title']
-        author = data['author']
-        quantity = int(data['quantity'])
-    except (ValueError, TypeError):
-        return create_response({"error": "Invalid data types for fields"}, 400)
+    book, error = decode_book(request.get_data())
+    if error:
+        return create_response({"error": error}, 400)
+    title, author, quantity = book
 
     db = get_db()
     try:
         with db.cursor() as cursor:
             new_id_var = cursor.var(oracledb.DB_TYPE_NUMBER)
-            sql = 'INSERT INTO books (title, author, quantity) VALUES (:1, :2, :3) RETURNING id INTO :4'
-            cursor.execute(sql, (title, author, quantity, new_id_var))
+            with autocommit(db):
+                cursor.execute(SQL_INSERT_BOOK, (title, author, quantity, new_id_var))
             new_book_id = int(new_id_var.getvalue()[0])
-            db.commit()
+        invalidate_book_pages()
 
         new_book = {"id": new_book_id, "title": title, "author": author, "quantity": quantity}
         return create_response(new_book, 201)
@@ -163,36 +262,70 @@ def add_book():
         return create_response({"error": f"Database error: {e}"}, 500)
 
 
-@bp.route('/<int:book_id>', methods=['PUT'])
-def update_book(book_id):
-    """Updates an existing book's details."""
+@bp.route('/batch', methods=['POST'])
+def add_books_batch():
+    """Adds several books in a single array-bound round-trip."""
+    rows, error = decode_books(request.get_data())
+    if error:
+        return create_response({"error": error}, 400)
+
     db = get_db()
-    book_to_update = db.cursor()
-    book_to_update.execute('SELECT * FROM books WHERE id = :1', (book_id,))
-    existing_book_data = rows_to_dicts(book_to_update)
-    book_to_update.close()
+    try:
+        with db.cursor() as cursor:
+            # The same single-row INSERT, array-bound: RETURNING fills one element of
+            # ids_var per row, and batcherrors keeps good rows going in when others fail
+            ids_var = cursor.var(oracledb.DB_TYPE_NUMBER, arraysize=len(rows))
+            cursor.setinputsizes(None, None, None, ids_var)
+            with autocommit(db):
+                cursor.executemany(SQL_INSERT_BOOK, rows, batcherrors=True)
+            errors = [{"index": error.offset, "error": error.message} for error in cursor.getbatcherrors()]
+            failed = {error["index"] for error in errors}
+            ids = [int(ids_var.getvalue(index)[0]) for index in range(len(rows)) if index not in failed]
+        invalidate_book_pages()
+
+        return create_response({"inserted": len(ids), "ids": ids, "errors": errors}, 201)
+    except oracledb.Error as e:
+        db.rollback()
+        return create_response({"error": f"Database error: {e}"}, 500)
 
-    if not existing_book_data:
-        return create_response({"error": "Book not found"}, 404)
 
-    data = request.get_json()
-    if not data:
+@bp.route('/<int:book_id>', methods=['PUT'])
+def update_book(book_id):
+    """Updates an existing book's details."""
+    changes, error = decode_book_patch(request.get_data())
+    if error:
+        return create_response({"error": error}, 400)
+    if all(value is None for value in changes):
         return create_response({"error": "Request body cannot be empty"}, 400)
+    title, author, quantity = changes
 
-    title = data.get('title', existing_book_data[0]['title'])
-    author = data.get('author', existing_book_data[0]['author'])
-    quantity = data.get('quantity', existing_book_data[0]['quantity'])
-
-    with db.cursor() as cursor:
-        cursor.execute('UPDATE books SET title = :1, author = :2, quantity = :3 WHERE id = :4',
-                       (title, author, quantity, book_id))
-    db.commit()
-
-    with db.cursor() as cursor:
-        cursor.execute('SELECT * FROM books WHERE id = :1', (book_id,))
-        updated_book = rows_to_dicts(cursor)[0]
-
-    return create_response(updated_book, 200)
+    # Fields left out of the body are passed as NULL so COALESCE keeps the
+    # current value; RETURNING hands back the updated row in the same round-trip.
+    db = get_db()
+    try:
+        with db.cursor() as cursor:
+            title_var = cursor.var(oracledb.DB_TYPE_VARCHAR)
+            author_var = cursor.var(oracledb.DB_TYPE_VARCHAR)
+            quantity_var = cursor.var(oracledb.DB_TYPE_NUMBER)
+            with autocommit(db):
+                cursor.execute(SQL_UPDATE_BOOK, (title, author, quantity,
+                                                 book_id, title_var, author_var, quantity_var))
+            if cursor.rowcount == 0:
+                return create_response({"error": "Book not found"}, 404)
+        invalidate_book(book_id)
+        invalidate_history()
+
+        quantity = quantity_var.getvalue()[0]
+        updated_book = {
+            "id": book_id,
+            "title": title_var.getvalue()[0],
+            "author": author_var.getvalue()[0],
+            "quantity": int(quantity) if quantity is not None else None
+        }
+        return create_response(updated_book, 200)
+    except oracledb.Error as e:
+        db.rollback()
+        return create_response({"error": f"Database error: {e}"}, 500)
 
 
 @bp.route('/<int:book_id>', methods=['DELETE'])
@@ -200,8 +333,10 @@ def delete_book(book_id):
     """Deletes a book from the library."""
     db = get_db()
     with db.cursor() as cursor:
-        cursor.execute('DELETE FROM books WHERE id = :1', (book_id,))
+        with autocommit(db):
+            cursor.execute(SQL_DELETE_BOOK, (book_id,))
         if cursor.rowcount == 0:
             return create_response({"error": "Book not found"}, 404)
-    db.commit()
+    invalidate_book(book_id)
+    invalidate_history()
     return create_response({"message": f"Book with id {book_id} has been deleted."}, 200)
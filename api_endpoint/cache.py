@@ -0,0 +1,202 @@
+"""
+Redis-backed caching helpers for the Flask API.
+Redis errors are logged and treated as cache misses so reads never fail because of the cache.
+"""
+from flask import current_app
+from redis.exceptions import RedisError
+from .logger import api_logger
+
+BOOK_CACHE_TTL = 300
+USER_CACHE_TTL = 60
+LIST_CACHE_TTL = 60
+
+# Every variant of the borrow history response that gets cached
+HISTORY_VARIANTS = ('v1', 'v2', 'v2:book')
+
+
+def book_key(book_id):
+    """Redis key holding the cached representation of a book."""
+    return f"book:{book_id}"
+
+
+def book_etag_key(book_id):
+    """Redis key holding just the current ETag of a book, for cheap revalidation."""
+    return f"book:etag:{book_id}"
+
+
+# All cached book list pages live in one hash, so any write drops them with a single DEL
+BOOK_PAGES_KEY = "books:pages"
+
+
+def user_key(user_id):
+    """Redis key holding the cached representation of a user."""
+    return f"user:{user_id}"
+
+
+# All cached user list pages live in one hash, like BOOK_PAGES_KEY
+USER_PAGES_KEY = "users:pages"
+
+
+def users_page_field(version, page, limit):
+    """Field of USER_PAGES_KEY holding one page of a version's user list."""
+    return f"{version}:{page}:{limit}"
+
+
+def history_key(variant):
+    """Redis key holding a cached borrow history response."""
+    return f"history:{variant}"
+
+
+def get_cached_body(key):
+    """Returns the cached (etag, body) pair stored under `key`, or None on a miss."""
+    client = current_app.redis
+    if client is None:
+        return None
+    try:
+        cached = client.get(key)
+    except RedisError as e:
+        api_logger.error(f"Cache read failed for {key}: {e}")
+        return None
+    if cached is None:
+        return None
+    etag, _, body = cached.partition('\n')
+    return etag, body
+
+
+def cache_body(key, etag, body, ttl):
+    """Stores an etag (may be empty) and serialized body under `key` for `ttl` seconds."""
+    client = current_app.redis
+    if client is None:
+        return
+    try:
+        client.setex(key, ttl, f"{etag}\n{body}")
+    except RedisError as e:
+        api_logger.error(f"Cache write failed for {key}: {e}")
+
+
+def invalidate(*keys):
+    """Drops cached entries after the data behind them has been modified."""
+    client = current_app.redis
+    if client is None:
+        return
+    try:
+        client.delete(*keys)
+    except RedisError as e:
+        api_logger.error(f"Cache invalidation failed for {', '.join(keys)}: {e}")
+
+
+def get_cached_etag(book_id):
+    """Returns the cached ETag for a book, or None on a miss."""
+    client = current_app.redis
+    if client is None:
+        return None
+    try:
+        return client.get(book_etag_key(book_id))
+    except RedisError as e:
+        api_logger.error(f"Cache read failed for book {book_id}: {e}")
+        return None
+
+
+def cache_etag(book_id, etag):
+    """Stores only a book's ETag, e.g. after a 304 that built no body."""
+    client = current_app.redis
+    if client is None:
+        return
+    try:
+        client.setex(book_etag_key(book_id), BOOK_CACHE_TTL, etag)
+    except RedisError as e:
+        api_logger.error(f"Cache write failed for book {book_id}: {e}")
+
+
+def get_cached_book(book_id):
+    """Returns the cached (etag, body) pair for a book, or None on a miss."""
+    return get_cached_body(book_key(book_id))
+
+
+def cache_book(book_id, etag, body):
+    """Stores a book's ETag and serialized body for BOOK_CACHE_TTL seconds."""
+    client = current_app.redis
+    if client is None:
+        return
+    try:
+        pipe = client.pipeline(transaction=False)
+        pipe.setex(book_etag_key(book_id), BOOK_CACHE_TTL, etag)
+        pipe.setex(book_key(book_id), BOOK_CACHE_TTL, f"{etag}\n{body}")
+        pipe.execute()
+    except RedisError as e:
+        api_logger.error(f"Cache write failed for book {book_id}: {e}")
+
+
+def _get_cached_page(pages_key, field):
+    """Returns the cached (etag, body) pair stored in the `pages_key` hash, or None on a miss."""
+    client = current_app.redis
+    if client is None:
+        return None
+    try:
+        cached = client.hget(pages_key, field)
+    except RedisError as e:
+        api_logger.error(f"Cache read failed for {pages_key} {field}: {e}")
+        return None
+    if cached is None:
+        return None
+    etag, _, body = cached.partition('\n')
+    return etag, body
+
+
+def _cache_page(pages_key, field, etag, body, ttl):
+    """Stores one list page; the whole hash expires `ttl` seconds after the last write."""
+    client = current_app.redis
+    if client is None:
+        return
+    try:
+        pipe = client.pipeline(transaction=False)
+        pipe.hset(pages_key, field, f"{etag}\n{body}")
+        pipe.expire(pages_key, ttl)
+        pipe.execute()
+    except RedisError as e:
+        api_logger.error(f"Cache write failed for {pages_key} {field}: {e}")
+
+
+def get_cached_book_page(field):
+    """Returns the cached (etag, body) pair for one book list page, or None on a miss."""
+    return _get_cached_page(BOOK_PAGES_KEY, field)
+
+
+def cache_book_page(field, etag, body):
+    """Stores one book list page; the whole hash expires BOOK_CACHE_TTL seconds after the last write."""
+    _cache_page(BOOK_PAGES_KEY, field, etag, body, BOOK_CACHE_TTL)
+
+
+def get_cached_user_page(field):
+    """Returns the cached (etag, body) pair for one user list page, or None on a miss."""
+    return _get_cached_page(USER_PAGES_KEY, field)
+
+
+def cache_user_page(field, etag, body):
+    """Stores one user list page; the whole hash expires LIST_CACHE_TTL seconds after the last write."""
+    _cache_page(USER_PAGES_KEY, field, etag, body, LIST_CACHE_TTL)
+
+
+def invalidate_book(book_id):
+    """Drops a book's cached representation, and every list page, after it has been modified."""
+    invalidate(book_key(book_id), book_etag_key(book_id), BOOK_PAGES_KEY)
+
+
+def invalidate_book_pages():
+    """Drops every cached book list page, e.g. after new books were added."""
+    invalidate(BOOK_PAGES_KEY)
+
+
+def invalidate_user(user_id):
+    """Drops a user's cached representation, and every user list page, after a write."""
+    invalidate(user_key(user_id), USER_PAGES_KEY)
+
+
+def invalidate_user_pages():
+    """Drops every cached user list page, e.g. after a user was added."""
+    invalidate(USER_PAGES_KEY)
+
+
+def invalidate_history():
+    """Drops every cached borrow history response after a borrow or return."""
+    invalidate(*[history_key(variant) for variant in HISTORY_VARIANTS])
@@ -2,10 +2,85 @@
 Circuit breaker implementation for the Flask API.
 Prevents cascading failures by stopping requests to failing services.
 """
-from pybreaker import CircuitBreaker
 from .logger import api_logger
 from .metrics import record_error
 import functools
+import threading
+import time
+
+
+class CircuitBreakerError(Exception):
+    """Raised when a call is rejected because the breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Minimal fail-count breaker. A closed breaker with no recorded failures only
+    compares two attributes per call; the lock is taken on failures and state changes.
+    Once the reset timeout has passed, a single trial call is let through while the
+    breaker is half-open; other callers fail fast until that trial resolves.
+    """
+    __slots__ = ('name', 'fail_max', 'reset_timeout', 'fail_counter', 'opened_at',
+                 'state', 'listeners', '_lock', '_trial_in_flight')
+
+    def __init__(self, fail_max=5, reset_timeout=60, listeners=None, name=None):
+        self.name = name
+        self.fail_max = fail_max
+        self.reset_timeout = reset_timeout
+        self.fail_counter = 0
+        self.opened_at = 0.0
+        self.state = 'closed'
+        self.listeners = list(listeners or [])
+        self._lock = threading.Lock()
+        self._trial_in_flight = False
+
+    @property
+    def current_state(self):
+        return self.state
+
+    def _set_state(self, new_state):
+        old_state, self.state = self.state, new_state
+        if new_state == 'open':
+            self.opened_at = time.monotonic()
+        for listener in self.listeners:
+            listener(self, old_state, new_state)
+
+    def _admit(self):
+        """Decides, under the lock, whether a call may go through an open or half-open breaker."""
+        with self._lock:
+            if self.state == 'open':
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    raise CircuitBreakerError(f"Circuit breaker '{self.name}' is open")
+                self._set_state('half_open')
+            elif self.state != 'half_open':
+                return False
+            if self._trial_in_flight:
+                raise CircuitBreakerError(f"Circuit breaker '{self.name}' is half-open, trial call in progress")
+            self._trial_in_flight = True
+            return True
+
+    def call(self, func, *args, **kwargs):
+        is_trial = self.state != 'closed' and self._admit()
+        try:
+            result = func(*args, **kwargs)
+        except Exception:
+            with self._lock:
+                self.fail_counter += 1
+                if self.state == 'half_open' or self.fail_counter >= self.fail_max:
+                    self._set_state('open')
+            raise
+        else:
+            if self.fail_counter or self.state != 'closed':
+                with self._lock:
+                    self.fail_counter = 0
+                    if self.state != 'closed':
+                        self._set_state('closed')
+            return result
+        finally:
+            # Runs after the state change above, so no second trial slips in meanwhile
+            if is_trial:
+                self._trial_in_flight = False
+
 
 # Circuit breakers for different services
 db_breaker = CircuitBreaker(
@@ -1,5 +1,7 @@
 # project/db.py
 import os
+import re
+from contextlib import contextmanager
 import oracledb
 from flask import g, current_app
 from .circuit_breaker import db_breaker
@@ -8,9 +10,9 @@ from .logger import api_logger
 def get_db():
     """Get a pooled connection for the current request with circuit breaker protection."""
     if 'db' not in g:
+        pool = current_app.pool
         try:
-            # Use circuit breaker to protect database connection
-            g.db = db_breaker.call(current_app.pool.acquire)
+            g.db = db_breaker.call(pool.acquire)
         except Exception as e:
             api_logger.error(f"Failed to acquire database connection: {str(e)}")
             raise
@@ -22,11 +24,59 @@ def close_db(e=None):
     db = g.pop('db', None)
     if db is not None:
         try:
-            db.close()  # returns to pool, not truly closed
+            current_app.pool.release(db)
         except Exception as ex:
             api_logger.error(f"Error closing database connection: {str(ex)}")
 
 
+@contextmanager
+def autocommit(db):
+    """Commit whatever the enclosed statement writes as part of that statement's round-trip.
+
+    Wrap only the last DML of a transaction: earlier statements stay uncommitted
+    until it runs, and read-only paths never send a COMMIT at all.
+    """
+    db.autocommit = True
+    try:
+        yield db
+    finally:
+        db.autocommit = False
+
+
+# An unquoted Oracle identifier: DB_SCHEMA is spliced into the ALTER SESSION text
+_SCHEMA_NAME = re.compile(r'[A-Za-z][A-Za-z0-9_$#]*')
+
+
+def _session_callback(schema):
+    """
+    Returns the pool's session_callback for DB_SCHEMA, or None when it is unset:
+    sessions then already default to DB_USER's schema, and need no extra round-trip.
+    """
+    if not schema:
+        return None
+    if not _SCHEMA_NAME.fullmatch(schema):
+        raise RuntimeError(f"DB_SCHEMA is not a valid schema name: {schema!r}")
+    statement = f'ALTER SESSION SET CURRENT_SCHEMA = "{schema.upper()}"'
+
+    def init_session(connection, requested_tag):
+        """Prepare a freshly created physical session before it is first handed out."""
+        with connection.cursor() as cursor:
+            cursor.execute(statement)
+
+    return init_session
+
+
+def _warm_pool(pool, count):
+    """Open and initialize `count` sessions up front so first requests don't pay for it."""
+    connections = []
+    try:
+        for _ in range(count):
+            connections.append(pool.acquire())
+    finally:
+        for connection in connections:
+            pool.release(connection)
+
+
 def init_app(app):
     """Initialize the database pool and register teardown."""
     DB_USER = os.getenv("DB_USER")
@@ -36,22 +86,53 @@ def init_app(app):
     if not DB_USER or not DB_PASSWORD or not CONNECT_STRING:
         raise RuntimeError("Database configuration environment variables are not set.")
 
+    # Defaults scale with the CPU count; DB_POOL_MIN / DB_POOL_MAX override them.
+    # The pool is per worker process, so DB_POOL_MAX should cover gunicorn's --threads.
+    cpu_count = os.cpu_count() or 1
+    pool_min = int(os.getenv("DB_POOL_MIN", max(4, cpu_count * 2)))
+    pool_max = max(pool_min, int(os.getenv("DB_POOL_MAX", max(pool_min, cpu_count * 4))))
+
+    # cclass/purity below only take effect when sessions come from a DRCP pooled
+    # server; DB_DRCP requests one without editing CONNECT_STRING (needs DRCP
+    # started on the database: DBMS_CONNECTION_POOL.START_POOL)
+    server_type = "pooled" if os.getenv("DB_DRCP", "false").lower() in ("true", "1", "t") else None
+
+    # Only registered when DB_SCHEMA is set; rejects an invalid name before connecting
+    session_callback = _session_callback(os.getenv("DB_SCHEMA"))
+
+    # Fetch CLOB columns as plain strings instead of LOB locators that need extra round-trips
+    oracledb.defaults.fetch_lobs = False
+
     try:
         pool = oracledb.create_pool(
             user=DB_USER,
             password=DB_PASSWORD,
             dsn=CONNECT_STRING,
-            min=1,
-            max=5,
-            increment=1,
-            timeout=60
+            min=pool_min,
+            max=pool_max,
+            increment=2,
+            timeout=60,
+            # wait_timeout only applies in TIMEDWAIT mode: when every session is busy
+            # for 2s the acquire fails fast instead of queueing the request forever
+            getmode=oracledb.POOL_GETMODE_TIMEDWAIT,
+            wait_timeout=2000,
+            homogeneous=True,
+            session_callback=session_callback,
+            server_type=server_type,
+            cclass="APIPOOL",
+            purity=oracledb.PURITY_SELF,
+            stmtcachesize=64
         )
+        _warm_pool(pool, pool_min)
         # Attach the pool to the app object
         app.pool = pool
-        api_logger.info("Database connection pool created successfully.")
+        # Thin mode unless init_oracle_client() was called, which this app never does
+        mode = "thin" if oracledb.is_thin_mode() else "thick"
+        api_logger.info(f"Database connection pool created successfully "
+                        f"(min={pool_min}, max={pool_max}, mode={mode}, drcp={server_type == 'pooled'}).")
     except oracledb.Error as e:
         api_logger.error(f"Error creating connection pool: {e}")
         exit(1)
 
     # Register the close_db function to be called on app context teardown
-    app.teardown_appcontext(close_db)
\ No newline at end of file
+    app.teardown_appcontext(close_db)
@@ -1,40 +1,207 @@
-from flask import jsonify, make_response, url_for, request
+from flask import url_for, request, Response, stream_with_context, current_app
+from flask.json.provider import JSONProvider
 from .logger import api_logger
 from .metrics import record_error
 import functools
+import hashlib
+import orjson
+from urllib.parse import urlencode
+from werkzeug.http import quote_etag
 
-# --- Helper Function for JSON Responses ---
-def create_response(data, status_code, headers=None):
-    """Creates a Flask JSON response."""
-    response = jsonify(data)
-    response.status_code = status_code
-    if headers:
-        for key, value in headers.items():
-            response.headers[key] = value
-    return response
+# The JSON response and row helpers live in jsonresp so old_app.py can share them
+from .jsonresp import create_response, create_body_response, rows_to_dicts
+from .jsonresp import JSON_CONTENT_TYPE as _JSON_CONTENT_TYPE
+
+def body_etag(body):
+    """ETag for an already-serialized body: the hex BLAKE2b-128 digest of its bytes."""
+    return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+# Single resources may be reused by the client for a minute, then revalidated by ETag
+RESOURCE_CACHE_CONTROL = 'private, max-age=60'
+
+def resource_headers(etag):
+    """Validator and caching headers sent with a single resource and with its 304s."""
+    return {'ETag': quote_etag(etag), 'Cache-Control': RESOURCE_CACHE_CONTROL}
+
+# Histories change with every borrow and return, and name who borrowed what:
+# only the client may reuse them, briefly, then revalidate by ETag
+HISTORY_HEADERS = {'Cache-Control': 'private, max-age=60'}
+
+def matched_etag(etag):
+    """
+    The validator a client's If-None-Match holds for `etag`, or None when it holds none.
+    Flask-Compress sends a compressed body's ETag as "<etag>:gzip", so that variant
+    matches too and is returned as is: the 304 must repeat what the client has stored.
+    """
+    if not etag:
+        return None
+    tags = request.if_none_match
+    if not tags:
+        return None
+    for encoding in current_app.config['COMPRESS_ALGORITHM']:
+        encoded = f"{etag}:{encoding}"
+        if tags.contains_weak(encoded):
+            return encoded
+    # Weak comparison: a W/ prefix still matches, as If-None-Match requires
+    return etag if tags.contains_weak(etag) else None
+
+def not_modified(etag):
+    """Empty 304 for a single resource, repeating the matched ETag and Cache-Control."""
+    return Response(status=304, headers=resource_headers(etag))
+
+def rows_etag(*parts):
+    """ETag for a list page computed from its raw rows and page context, before any links are built."""
+    return body_etag(orjson.dumps(parts))
+
+def list_not_modified(etag, headers=None):
+    """Empty 304 when If-None-Match matches `etag`, otherwise None so the caller builds the body."""
+    matched = matched_etag(etag)
+    if matched is None:
+        return None
+    return Response(status=304, headers={**(headers or {}), 'ETag': quote_etag(matched)})
+
+def etag_response(body, etag, headers=None):
+    """Answers 304 when If-None-Match matches `etag`, otherwise sends the body with that ETag."""
+    return list_not_modified(etag, headers) or create_body_response(
+        body, 200, {**(headers or {}), 'ETag': quote_etag(etag)})
+
+class OrjsonProvider(JSONProvider):
+    """app.json provider so jsonify and views returning dicts also use orjson."""
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS), content_type=_JSON_CONTENT_TYPE
+        )
 
 # --- Helper to convert Oracle rows to Dictionaries ---
-def rows_to_dicts(cursor):
-    """Converts cursor results to a list of dictionaries."""
-    # Column names need to be lowercase for consistent JSON keys
+def row_to_dict(cursor):
+    """Fetches a single row as a dictionary, or None if there is no row."""
+    row = cursor.fetchone()
+    if row is None:
+        return None
+    return dict(zip([col[0].lower() for col in cursor.description], row))
+
+def fetch_counted_page(cursor, page_sql, page_params, count_sql, count_params=None):
+    """
+    Runs a page query that also selects COUNT(*) OVER () AS total_items and
+    returns (total_items, rows). The total rides along on every row, so only an
+    empty page (past the end, or nothing matches) needs a separate COUNT query.
+    """
+    cursor.execute(page_sql, page_params)
+    rows = rows_to_dicts(cursor)
+    if not rows:
+        cursor.execute(count_sql, count_params or {})
+        return cursor.fetchone()[0], rows
+    total_items = rows[0]['total_items']
+    for row in rows:
+        del row['total_items']
+    return total_items, rows
+
+# --- Cursor for multi-row result sets ---
+def tuned_cursor(db, arraysize=1000):
+    """
+    Returns a cursor that fetches `arraysize` rows per round-trip.
+    prefetchrows is one more, so the end of the result set arrives with the first batch.
+    """
+    cursor = db.cursor()
+    cursor.arraysize = arraysize
+    cursor.prefetchrows = arraysize + 1
+    return cursor
+
+# --- Streaming JSON arrays ---
+def stream_json_rows(cursor, transform=None, on_complete=None, headers=None):
+    """
+    Streams an executed cursor's rows as a JSON array, one fetchmany() batch per chunk,
+    so the full list of dicts is never held in memory. `transform` is applied to each
+    row dict; `on_complete` receives the whole body once the last row has been sent.
+    The cursor is closed when the stream ends. No ETag can be sent, as the body is
+    not known until it has been streamed.
+    """
     columns = [col[0].lower() for col in cursor.description]
-    return [dict(zip(columns, row)) for row in cursor]
+    cursor.rowfactory = lambda *row: dict(zip(columns, row))
+
+    def generate():
+        parts = [] if on_complete else None
+        separator = b''
+        try:
+            yield b'['
+            while True:
+                rows = cursor.fetchmany()
+                if not rows:
+                    break
+                if transform:
+                    rows = [transform(row) for row in rows]
+                # One orjson call per batch; the brackets of the batch array are dropped
+                chunk = separator + orjson.dumps(rows)[1:-1]
+                separator = b','
+                if parts is not None:
+                    parts.append(chunk)
+                yield chunk
+        finally:
+            cursor.close()
+        if on_complete:
+            on_complete(b'[' + b''.join(parts) + b']')
+        yield b']'
+
+    return Response(stream_with_context(generate()), status=200, content_type=_JSON_CONTENT_TYPE, headers=headers)
 
 # --- HATEOAS Link Generation Helpers ---
 
+# Stand-in id used to build a URL once and then format it for every record
+_URL_PLACEHOLDER = 987654321
+
+# Templates only depend on the host the request came in on, so they are kept
+# for the life of the process. Capped in case clients send many Host headers.
+_url_templates = {}
+_URL_TEMPLATES_MAX = 256
+
+def url_template(endpoint, param=None):
+    """
+    Returns the external URL for an endpoint. When `param` is given, the URL
+    contains a '{}' placeholder for it. Templates are cached per host, so url_for
+    runs once per endpoint per process instead of once per record.
+    """
+    key = (request.host_url, endpoint, param)
+    template = _url_templates.get(key)
+    if template is None:
+        if param is None:
+            template = url_for(endpoint, _external=True)
+        else:
+            template = url_for(endpoint, _external=True, **{param: _URL_PLACEHOLDER})
+            template = template.replace(str(_URL_PLACEHOLDER), '{}')
+        if len(_url_templates) >= _URL_TEMPLATES_MAX:
+            _url_templates.clear()
+        _url_templates[key] = template
+    return template
+
+def page_url(endpoint, **params):
+    """
+    Returns the external URL of a list endpoint with `params` as its query string.
+    The base URL comes from url_template; None values are left out, as url_for does.
+    """
+    query = urlencode({k: v for k, v in params.items() if v is not None})
+    return f"{url_template(endpoint)}?{query}"
+
 def add_user_links(user):
     """Injects HATEOAS links into a user resource."""
     user['_links'] = {
         'self': {
-            'href': url_for('users.get_user_by_id', user_id=user['id'], _external=True),
+            'href': url_template('users.get_user_by_id', 'user_id').format(user['id']),
             'method': 'GET'
         },
         'history': {
-            'href': url_for('users.get_user_borrow_history', user_id=user['id'], _external=True),
+            'href': url_template('users.get_user_borrow_history', 'user_id').format(user['id']),
             'method': 'GET'
         },
         'collection': {
-             'href': url_for('users.get_all_users', _external=True),
+             'href': url_template('users.get_all_users'),
              'method': 'GET'
         }
     }
@@ -44,18 +211,18 @@ def add_book_links(book):
     """Injects HATEOAS links into a book resource."""
     book['_links'] = {
         'self': {
-            'href': url_for('books.get_book_by_id', book_id=book['id'], _external=True),
+            'href': url_template('books.get_book_by_id', 'book_id').format(book['id']),
             'method': 'GET'
         },
         'collection': {
-             'href': url_for('books.get_all_books', _external=True),
+             'href': url_template('books.get_all_books'),
              'method': 'GET'
         }
     }
     # Conditionally add the 'borrow' action link if the book is in stock
     if book.get('quantity', 0) > 0:
         book['_links']['borrow'] = {
-            'href': url_for('library.borrow_book', _external=True),
+            'href': url_template('library.borrow_book'),
             'method': 'POST',
             'schema': {'user_id': 'integer', 'book_id': 'integer'}
         }
@@ -65,18 +232,18 @@ def add_borrow_record_links(record):
     """Injects HATEOAS links into a borrow record resource."""
     record['_links'] = {
         'user': {
-            'href': url_for('users.get_user_by_id', user_id=record['user_id'], _external=True),
+            'href': url_template('users.get_user_by_id', 'user_id').format(record['user_id']),
             'method': 'GET'
         },
         'book': {
-            'href': url_for('books.get_book_by_id', book_id=record['book']['id'], _external=True),
+            'href': url_template('books.get_book_by_id', 'book_id').format(record['book']['id']),
             'method': 'GET'
         }
     }
     # If the book hasn't been returned, provide the link to the 'return' action
     if record.get('return_date') is None:
         record['_links']['return'] = {
-            'href': url_for('library.return_book', _external=True),
+            'href': url_template('library.return_book'),
             'method': 'POST',
             'schema': {'user_id': 'integer', 'book_id': 'integer'}
         }
@@ -88,20 +255,21 @@ def log_request(f):
     """Decorator to log request and response details."""
     @functools.wraps(f)
     def decorated_function(*args, **kwargs):
-        api_logger.info(
-            f"[{request.method}] {request.path} - IP: {request.remote_addr} - Args: {request.args}"
-        )
+        # Resolve the request proxy once instead of on every attribute access
+        req = request._get_current_object()
+        method, path, remote_addr, query_args = req.method, req.path, req.remote_addr, req.args
+        # %-style args: request.args is only stringified if the record is emitted
+        api_logger.info("[%s] %s - IP: %s - Args: %s", method, path, remote_addr, query_args)
         try:
             result = f(*args, **kwargs)
             if isinstance(result, tuple):
                 status_code = result[1]
             else:
-                status_code = 200
-            api_logger.info(f"Response Status: {status_code}")
+                status_code = getattr(result, 'status_code', 200)
+            api_logger.info("Response Status: %s", status_code)
             return result
         except Exception as e:
-            api_logger.error(f"Error in {f.__name__}: {str(e)}", exc_info=True)
+            api_logger.error("Error in %s: %s", f.__name__, e, exc_info=True)
             record_error(type(e).__name__)
             raise
-    return decorated_function
     return decorated_function
\ No newline at end of file
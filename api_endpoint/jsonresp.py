@@ -0,0 +1,31 @@
+"""
+JSON response and row helpers shared by the blueprint API and old_app.py.
+Only flask and orjson are imported, so loading this module sets up no logging,
+metrics or other app state.
+"""
+from flask import Response
+import orjson
+
+# A fixed content_type skips Werkzeug's mimetype-to-Content-Type derivation
+JSON_CONTENT_TYPE = 'application/json'
+
+
+# --- Helper Function for JSON Responses ---
+def create_response(data, status_code, headers=None):
+    """Creates a Flask JSON response, serialized with orjson."""
+    return create_body_response(orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS), status_code, headers)
+
+
+def create_body_response(body, status_code, headers=None):
+    """Creates a JSON response from an already-serialized body."""
+    return Response(body, status=status_code, content_type=JSON_CONTENT_TYPE, headers=headers)
+
+
+# --- Helper to convert Oracle rows to Dictionaries ---
+def rows_to_dicts(cursor):
+    """Converts cursor results to a list of dictionaries."""
+    # Column names need to be lowercase for consistent JSON keys
+    columns = [col[0].lower() for col in cursor.description]
+    # Let the driver build each dict as it fetches, instead of a second pass
+    cursor.rowfactory = lambda *row: dict(zip(columns, row))
+    return cursor.fetchall()
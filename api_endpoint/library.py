@@ -1,8 +1,11 @@
 # project/library.py
 import oracledb
-from datetime import datetime
+import orjson
 from flask import Blueprint, request
-from .db import get_db
+from .db import get_db, autocommit
+from .validation import decode_borrow
+from .sql import SQL_BORROW_BOOK, SQL_RETURN_BOOK, SQL_BORROW_HISTORY
+from .cache import LIST_CACHE_TTL, history_key, get_cached_body, cache_body, invalidate_book, invalidate_history
 from .helper import * # Assumes helper.py is now in the same directory
 
 bp = Blueprint('library', __name__)
@@ -11,38 +14,35 @@ bp = Blueprint('library', __name__)
 def borrow_book():
     """Borrows a book, decrementing its quantity."""
     # ... (code for borrow_book is identical, no changes needed)
-    data = request.get_json()
-    if not data or 'user_id' not in data or 'book_id' not in data:
-        return create_response({"error": "Missing user_id or book_id"}, 400)
+    borrow, error = decode_borrow(request.get_data())
+    if error:
+        return create_response({"error": error}, 400)
 
-    user_id = data['user_id']
-    book_id = data['book_id']
+    user_id, book_id = borrow
     db = get_db()
     
     try:
         with db.cursor() as cursor:
-            cursor.execute('SELECT id FROM users WHERE id = :1', (user_id,))
-            if not cursor.fetchone():
+            title_var = cursor.var(oracledb.DB_TYPE_VARCHAR)
+            borrowed_var = cursor.var(oracledb.DB_TYPE_NUMBER)
+            user_count_var = cursor.var(oracledb.DB_TYPE_NUMBER)
+            quantity_var = cursor.var(oracledb.DB_TYPE_NUMBER)
+            with autocommit(db):
+                cursor.execute(SQL_BORROW_BOOK, {
+                    'book_id': book_id, 'user_id': user_id,
+                    'title': title_var, 'borrowed': borrowed_var,
+                    'user_count': user_count_var, 'quantity': quantity_var
+                })
+
+        if not borrowed_var.getvalue():
+            if not user_count_var.getvalue():
                 return create_response({"error": "User not found"}, 404)
-
-            cursor.execute('SELECT title FROM books WHERE id = :1', (book_id,))
-            book_row = cursor.fetchone()
-            if not book_row:
+            if quantity_var.getvalue() is None:
                 return create_response({"error": "Book not found"}, 404)
-            book_title = book_row[0]
-
-            cursor.execute(
-                'UPDATE books SET quantity = quantity - 1 WHERE id = :1 AND quantity > 0',
-                (book_id,)
-            )
-
-            if cursor.rowcount == 0:
-                db.rollback()
-                return create_response({"error": "Book is out of stock"}, 400)
-
-            cursor.execute('INSERT INTO borrow_records (user_id, book_id, borrow_date) VALUES (:1, :2, :3)',
-                           (user_id, book_id, datetime.now()))
-            db.commit()
+            return create_response({"error": "Book is out of stock"}, 400)
+        book_title = title_var.getvalue()
+        invalidate_book(book_id)
+        invalidate_history()
 
     except oracledb.Error as e:
         db.rollback()
@@ -55,31 +55,28 @@ def borrow_book():
 def return_book():
     """Returns a book, incrementing its quantity."""
     # ... (code for return_book is identical, no changes needed)
-    data = request.get_json()
-    if not data or 'user_id' not in data or 'book_id' not in data:
-        return create_response({"error": "Missing user_id or book_id"}, 400)
+    borrow, error = decode_borrow(request.get_data())
+    if error:
+        return create_response({"error": error}, 400)
 
-    user_id = data['user_id']
-    book_id = data['book_id']
+    user_id, book_id = borrow
     db = get_db()
 
     try:
         with db.cursor() as cursor:
-            sql = 'SELECT id FROM borrow_records WHERE user_id = :1 AND book_id = :2 AND return_date IS NULL'
-            cursor.execute(sql, (user_id, book_id))
-            record = cursor.fetchone()
-
-            if not record:
-                return create_response({"error": "No active borrow record found for this user and book"}, 400)
-            record_id = record[0]
-            
-            cursor.execute('SELECT title FROM books WHERE id = :1', (book_id,))
-            book_title_row = cursor.fetchone()
-            book_title = book_title_row[0] if book_title_row else "Unknown Book"
-
-            cursor.execute('UPDATE books SET quantity = quantity + 1 WHERE id = :1', (book_id,))
-            cursor.execute('UPDATE borrow_records SET return_date = :1 WHERE id = :2', (datetime.now(), record_id))
-            db.commit()
+            title_var = cursor.var(oracledb.DB_TYPE_VARCHAR)
+            returned_var = cursor.var(oracledb.DB_TYPE_NUMBER)
+            with autocommit(db):
+                cursor.execute(SQL_RETURN_BOOK, {
+                    'book_id': book_id, 'user_id': user_id,
+                    'title': title_var, 'returned': returned_var
+                })
+
+        if not returned_var.getvalue():
+            return create_response({"error": "No active borrow record found for this user and book"}, 400)
+        book_title = title_var.getvalue() or "Unknown Book"
+        invalidate_book(book_id)
+        invalidate_history()
 
     except oracledb.Error as e:
         db.rollback()
@@ -91,22 +88,22 @@ def return_book():
 @bp.route('/borrow/history', methods=['GET'])
 def get_borrow_history():
     """Retrieves the complete history of all borrow records."""
+    key = history_key('v1')
+    cached = get_cached_body(key)
+    if cached:
+        etag, body = cached
+        return etag_response(body, etag, HISTORY_HEADERS)
+
     db = get_db()
-    query = """
-        SELECT
-            br.id, br.user_id, u.name as user_name,
-            br.book_id, b.title as book_title,
-            br.borrow_date, br.return_date
-        FROM borrow_records br
-        JOIN books b ON br.book_id = b.id
-        JOIN users u ON br.user_id = u.id
-        ORDER BY br.borrow_date DESC
-    """
-    with db.cursor() as cursor:
-        cursor.execute(query)
-        records = rows_to_dicts(cursor)
-    
-    # This helper MUST be updated. See notes below.
-    # records = [add_borrow_record_links(rec) for rec in records]
+    try:
+        with db.cursor() as cursor:
+            cursor.execute(SQL_BORROW_HISTORY)
+            # fetch_lobs is off, so the CLOB arrives as a str with the row
+            body = cursor.fetchone()[0] or '[]'
+    except oracledb.Error as e:
+        return create_response({"error": f"Database error: {e}"}, 500)
 
-    return create_response(records, 200)
\ No newline at end of file
+    # Borrows and returns drop this entry, so the TTL only bounds memory use
+    etag = body_etag(body.encode('utf-8'))
+    cache_body(key, etag, body, LIST_CACHE_TTL)
+    return etag_response(body, etag, HISTORY_HEADERS)
\ No newline at end of file
@@ -1,8 +1,11 @@
 # project/library.py
 import oracledb
-from datetime import datetime
+import orjson
 from flask import Blueprint, request
-from .db import get_db
+from .db import get_db, autocommit
+from .validation import decode_borrow
+from .sql import SQL_BORROW_BOOK, SQL_RETURN_BOOK
+from .cache import LIST_CACHE_TTL, history_key, get_cached_body, cache_body, invalidate_book, invalidate_history
 from .helper import * # Assumes helper.py is now in the same directory
 
 bp = Blueprint('library_v2', __name__)
@@ -11,38 +14,35 @@ bp = Blueprint('library_v2', __name__)
 def borrow_book():
     """Borrows a book, decrementing its quantity."""
     # ... (code for borrow_book is identical, no changes needed)
-    data = request.get_json()
-    if not data or 'user_id' not in data or 'book_id' not in data:
-        return create_response({"error": "Missing user_id or book_id"}, 400)
+    borrow, error = decode_borrow(request.get_data())
+    if error:
+        return create_response({"error": error}, 400)
 
-    user_id = data['user_id']
-    book_id = data['book_id']
+    user_id, book_id = borrow
     db = get_db()
     
     try:
         with db.cursor() as cursor:
-            cursor.execute('SELECT id FROM users WHERE id = :1', (user_id,))
-            if not cursor.fetchone():
+            title_var = cursor.var(oracledb.DB_TYPE_VARCHAR)
+            borrowed_var = cursor.var(oracledb.DB_TYPE_NUMBER)
+            user_count_var = cursor.var(oracledb.DB_TYPE_NUMBER)
+            quantity_var = cursor.var(oracledb.DB_TYPE_NUMBER)
+            with autocommit(db):
+                cursor.execute(SQL_BORROW_BOOK, {
+                    'book_id': book_id, 'user_id': user_id,
+                    'title': title_var, 'borrowed': borrowed_var,
+                    'user_count': user_count_var, 'quantity': quantity_var
+                })
+
+        if not borrowed_var.getvalue():
+            if not user_count_var.getvalue():
                 return create_response({"error": "User not found"}, 404)
-
-            cursor.execute('SELECT title FROM books WHERE id = :1', (book_id,))
-            book_row = cursor.fetchone()
-            if not book_row:
+            if quantity_var.getvalue() is None:
                 return create_response({"error": "Book not found"}, 404)
-            book_title = book_row[0]
-
-            cursor.execute(
-                'UPDATE books SET quantity = quantity - 1 WHERE id = :1 AND quantity > 0',
-                (book_id,)
-            )
-
-            if cursor.rowcount == 0:
-                db.rollback()
-                return create_response({"error": "Book is out of stock"}, 400)
-
-            cursor.execute('INSERT INTO borrow_records (user_id, book_id, borrow_date) VALUES (:1, :2, :3)',
-                           (user_id, book_id, datetime.now()))
-            db.commit()
+            return create_response({"error": "Book is out of stock"}, 400)
+        book_title = title_var.getvalue()
+        invalidate_book(book_id)
+        invalidate_history()
 
     except oracledb.Error as e:
         db.rollback()
@@ -55,31 +55,28 @@ def borrow_book():
 def return_book():
     """Returns a book, incrementing its quantity."""
     # ... (code for return_book is identical, no changes needed)
-    data = request.get_json()
-    if not data or 'user_id' not in data or 'book_id' not in data:
-        return create_response({"error": "Missing user_id or book_id"}, 400)
+    borrow, error = decode_borrow(request.get_data())
+    if error:
+        return create_response({"error": error}, 400)
 
-    user_id = data['user_id']
-    book_id = data['book_id']
+    user_id, book_id = borrow
     db = get_db()
 
     try:
         with db.cursor() as cursor:
-            sql = 'SELECT id FROM borrow_records WHERE user_id = :1 AND book_id = :2 AND return_date IS NULL'
-            cursor.execute(sql, (user_id, book_id))
-            record = cursor.fetchone()
-
-            if not record:
-                return create_response({"error": "No active borrow record found for this user and book"}, 400)
-            record_id = record[0]
-            
-            cursor.execute('SELECT title FROM books WHERE id = :1', (book_id,))
-            book_title_row = cursor.fetchone()
-            book_title = book_title_row[0] if book_title_row else "Unknown Book"
-
-            cursor.execute('UPDATE books SET quantity = quantity + 1 WHERE id = :1', (book_id,))
-            cursor.execute('UPDATE borrow_records SET return_date = :1 WHERE id = :2', (datetime.now(), record_id))
-            db.commit()
+            title_var = cursor.var(oracledb.DB_TYPE_VARCHAR)
+            returned_var = cursor.var(oracledb.DB_TYPE_NUMBER)
+            with autocommit(db):
+                cursor.execute(SQL_RETURN_BOOK, {
+                    'book_id': book_id, 'user_id': user_id,
+                    'title': title_var, 'returned': returned_var
+                })
+
+        if not returned_var.getvalue():
+            return create_response({"error": "No active borrow record found for this user and book"}, 400)
+        book_title = title_var.getvalue() or "Unknown Book"
+        invalidate_book(book_id)
+        invalidate_history()
 
     except oracledb.Error as e:
         db.rollback()
@@ -91,14 +88,36 @@ def return_book():
 @bp.route('/borrow/history', methods=['GET'])
 def get_borrow_history():
     """
-    Retrieves the complete history of all borrow records.
+    Retrieves the history of all borrow records, newest first.
     Optionally includes full book details via ?include=book query parameter.
+
+    Accepts query parameters for keyset pagination:
+    - limit: The number of records per page; without it the full history is streamed
+    - after_id: Return the records that come after this record id in the history
     """
-    db = get_db()
-    
     # Check for the '?include=book' query parameter
     include_book_details = request.args.get('include') == 'book'
 
+    limit = request.args.get('limit')
+    after_id = request.args.get('after_id')
+    paginated = limit is not None or after_id is not None
+    try:
+        limit = int(limit) if limit is not None else 10
+        after_id = int(after_id) if after_id is not None else None
+        if limit < 1 or (after_id is not None and after_id < 0):
+            raise ValueError
+    except ValueError:
+        return create_response({"error": "Invalid 'limit' or 'after_id'. Must be positive integers."}, 400)
+
+    key = history_key('v2:book' if include_book_details else 'v2')
+    if not paginated:
+        cached = get_cached_body(key)
+        if cached:
+            etag, body = cached
+            return etag_response(body, etag, HISTORY_HEADERS)
+
+    db = get_db()
+
     # Base fields to select
     query_fields = [
         "br.id", "br.user_id", "u.name as user_name",
@@ -118,47 +137,72 @@ def get_borrow_history():
             "br.book_id as book_id", 
         ])
 
-    # Dynamically build the SELECT statement
-    query = f"""
-        SELECT
-            {', '.join(query_fields)}
+    # Post-processing: nest the book fields into a 'book' object and add links
+    def to_record(rec):
+        book_data = {'id': rec.pop('book_id')}
+        if include_book_details:
+            book_data['title'] = rec.pop('book_title')
+            book_data['author'] = rec.pop('book_author')
+            book_data['quantity'] = rec.pop('book_quantity')
+        rec['book'] = book_data
+        return add_borrow_record_links(rec)
+
+    # (borrow_date DESC, id DESC) matches ix_br_hist, so pages are read off the index without a sort
+    from_sql = """
         FROM borrow_records br
         JOIN books b ON br.book_id = b.id
         JOIN users u ON br.user_id = u.id
-        ORDER BY br.borrow_date DESC
     """
-    
-    with db.cursor() as cursor:
-        cursor.execute(query)
-        records = rows_to_dicts(cursor)
-    
-    # Post-processing: If details were requested, nest them into a 'book' object
-    if include_book_details:
-        processed_records = []
-        for rec in records:
-            # Create a nested 'book' object
-            book_data = {
-                'id': rec.pop('book_id'),
-                'title': rec.pop('book_title'),
-                'author': rec.pop('book_author'),
-                'quantity': rec.pop('book_quantity'),
-            }
-            rec['book'] = book_data  # Add the nested object to the record
-            processed_records.append(rec)
-        records = processed_records
-    else:
-        processed_records = []
-        for rec in records:
-            # Create a nested 'book' object
-            book_data = {
-                'id': rec.pop('book_id'),
-            }
-            rec['book'] = book_data  # Add the nested object to the record
-            processed_records.append(rec)
-        records = processed_records
 
-        
+    if paginated:
+        # Oracle has no row-value comparison, so (borrow_date, id) < (after) is spelled
+        # out; the first predicate alone bounds the index range scan
+        seek_sql = ""
+        params = {'limit': limit + 1}
+        if after_id is not None:
+            seek_sql = """
+                CROSS JOIN (SELECT borrow_date AS after_date FROM borrow_records WHERE id = :after_id) k
+                WHERE br.borrow_date <= k.after_date
+                  AND (br.borrow_date < k.after_date OR br.id < :after_id)
+            """
+            params['after_id'] = after_id
+        try:
+            # One extra row tells us whether a next page exists without a COUNT
+            with tuned_cursor(db, limit + 1) as cursor:
+                cursor.execute(f"""
+                    SELECT {', '.join(query_fields)}
+                    {from_sql}
+                    {seek_sql}
+                    ORDER BY br.borrow_date DESC, br.id DESC
+                    FETCH NEXT :limit ROWS ONLY
+                """, params)
+                records = rows_to_dicts(cursor)
+        except oracledb.Error as e:
+            return create_response({"error": f"Database error: {e}"}, 500)
+
+        has_more = len(records) > limit
+        response_data = {'data': [to_record(rec) for rec in records[:limit]]}
+        if has_more:
+            response_data['next_page_url'] = page_url('library_v2.get_borrow_history',
+                after_id=records[limit - 1]['id'], limit=limit,
+                include='book' if include_book_details else None)
+        body = orjson.dumps(response_data)
+        return etag_response(body, body_etag(body), HISTORY_HEADERS)
+
+    cursor = tuned_cursor(db, 2000)
+    try:
+        cursor.execute(f"""
+            SELECT {', '.join(query_fields)}
+            {from_sql}
+            ORDER BY br.borrow_date DESC, br.id DESC
+        """)
+    except oracledb.Error as e:
+        cursor.close()
+        return create_response({"error": f"Database error: {e}"}, 500)
 
-    records = [add_borrow_record_links(rec) for rec in records]
+    # Borrows and returns drop this entry, so the TTL only bounds memory use
+    def store(body):
+        cache_body(key, body_etag(body), body.decode('utf-8'), LIST_CACHE_TTL)
 
-    return create_response(records, 200)
\ No newline at end of file
+    # The ETag is only known once the body has been cached; later hits send it
+    return stream_json_rows(cursor, to_record, store, HISTORY_HEADERS)
\ No newline at end of file
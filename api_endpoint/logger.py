@@ -1,17 +1,76 @@
 """
 Centralized logging configuration for the Flask API.
 """
+import atexit
 import logging
 import logging.handlers
 import os
+import queue
+import threading
 from datetime import datetime
 
 
+class BufferedRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """
+    RotatingFileHandler that lets the file buffer batch writes instead of
+    flushing after every record. A daemon thread flushes every `flush_interval`
+    seconds; ERROR and above are flushed immediately.
+    """
+
+    def __init__(self, filename, buffer_size=65536, flush_interval=0.25, **kwargs):
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        super().__init__(filename, **kwargs)
+        self._closed = threading.Event()
+        threading.Thread(target=self._flush_periodically, name='log-flush', daemon=True).start()
+
+    def _open(self):
+        return open(self.baseFilename, self.mode, buffering=self.buffer_size,
+                    encoding=self.encoding, errors=self.errors)
+
+    def emit(self, record):
+        super().emit(record)
+        if record.levelno >= logging.ERROR:
+            self._flush_stream()
+
+    def flush(self):
+        # StreamHandler.emit calls this after every record; leave it to the buffer
+        pass
+
+    def _flush_stream(self):
+        self.acquire()
+        try:
+            if self.stream:
+                self.stream.flush()
+        finally:
+            self.release()
+
+    def _flush_periodically(self):
+        while not self._closed.wait(self.flush_interval):
+            self._flush_stream()
+
+    def close(self):
+        self._closed.set()
+        super().close()
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that enqueues the record as is. The stock prepare() formats the
+    message (and any traceback) on the logging thread; here that is left to the
+    listener's handlers. Records stay in-process, so nothing needs pickling, but
+    mutable logging args are read when the listener formats them, not at the call.
+    """
+
+    def prepare(self, record):
+        return record
+
+
 def setup_logging():
     """Configure logging for the Flask application."""
     
-    # Create logs directory if it doesn't exist
-    log_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'logs')
+    # Create logs directory if it doesn't exist (LOG_DIR overrides the repo's logs/)
+    log_dir = os.getenv('LOG_DIR') or os.path.join(os.path.dirname(os.path.dirname(__file__)), 'logs')
     if not os.path.exists(log_dir):
         os.makedirs(log_dir)
     
@@ -32,18 +91,17 @@ def setup_logging():
     
     # File handler for all logs
     log_file = os.path.join(log_dir, 'app.log')
-    file_handler = logging.handlers.RotatingFileHandler(
+    file_handler = BufferedRotatingFileHandler(
         log_file,
         maxBytes=10485760,
         backupCount=10
     )
     file_handler.setLevel(logging.DEBUG)
     file_handler.setFormatter(detailed_formatter)
-    logger.addHandler(file_handler)
     
     # File handler for rate limit logs
     rate_limit_file = os.path.join(log_dir, 'ratelimit.log')
-    rate_limit_handler = logging.handlers.RotatingFileHandler(
+    rate_limit_handler = BufferedRotatingFileHandler(
         rate_limit_file,
         maxBytes=5242880,
         backupCount=5
@@ -55,12 +113,28 @@ def setup_logging():
     console_handler = logging.StreamHandler()
     console_handler.setLevel(logging.INFO)
     console_handler.setFormatter(simple_formatter)
-    logger.addHandler(console_handler)
     
-    # Rate limit logger
+    # The loggers only enqueue records; background listeners format them and do
+    # the file and console I/O, so request threads never wait on either.
+    log_queue = queue.Queue(-1)
+    logger.addHandler(DeferredQueueHandler(log_queue))
+    listener = logging.handlers.QueueListener(
+        log_queue, file_handler, console_handler, respect_handler_level=True
+    )
+    
+    # Rate limit logger (its records still propagate to the main queue too)
+    rate_limit_queue = queue.Queue(-1)
     rate_limit_logger = logging.getLogger('flask_api.ratelimit')
-    rate_limit_logger.addHandler(rate_limit_handler)
+    rate_limit_logger.addHandler(DeferredQueueHandler(rate_limit_queue))
     rate_limit_logger.setLevel(logging.WARNING)
+    rate_limit_listener = logging.handlers.QueueListener(
+        rate_limit_queue, rate_limit_handler, respect_handler_level=True
+    )
+    
+    for queue_listener in (listener, rate_limit_listener):
+        queue_listener.start()
+        # Flush whatever is still queued when the process exits
+        atexit.register(queue_listener.stop)
     
     return logger, rate_limit_logger
 
@@ -0,0 +1,31 @@
+"""
+Password hashing shared by the v1 and v2 auth blueprints.
+New hashes are Argon2id; werkzeug pbkdf2 hashes from older registrations still verify.
+"""
+from werkzeug.security import check_password_hash
+from argon2 import PasswordHasher
+from argon2.exceptions import VerificationError, InvalidHashError
+
+# Argon2id runs in C and releases the GIL while hashing.
+_ph = PasswordHasher(time_cost=2, memory_cost=64 * 1024, parallelism=1)
+
+# Verified against when the email is unknown, so a miss costs as much as a
+# wrong password and response timing does not reveal registered emails.
+DUMMY_HASH = _ph.hash("!unused!")
+
+
+def hash_password(password):
+    """Hashes a new password with Argon2id."""
+    return _ph.hash(password)
+
+
+def verify_password(stored_hash, password):
+    """Checks a password against an Argon2 hash, or a legacy werkzeug pbkdf2 hash."""
+    if not stored_hash:
+        return False
+    if stored_hash.startswith('$argon2'):
+        try:
+            return _ph.verify(stored_hash, password)
+        except (VerificationError, InvalidHashError):
+            return False
+    return check_password_hash(stored_hash, password)
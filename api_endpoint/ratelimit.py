@@ -0,0 +1,145 @@
+"""
+Redis-backed rate limiting for the Flask API.
+Every configured window is checked with a single EVALSHA round-trip per request,
+falling back to process-local counters while Redis is unreachable.
+"""
+import threading
+import time
+from math import ceil
+from flask import request, current_app
+from redis.exceptions import NoScriptError, RedisError
+from .helper import create_response
+from .logger import api_logger, rate_limit_logger
+from .metrics import record_rate_limit
+
+# For each key: INCR, set the window expiry on the first hit, and return the
+# (count, remaining ttl in ms) pair. ARGV[i] is the window length for KEYS[i].
+SCRIPT = """
+local result = {}
+for i, key in ipairs(KEYS) do
+    local c = redis.call('INCR', key)
+    if c == 1 then redis.call('PEXPIRE', key, ARGV[i]) end
+    result[#result + 1] = c
+    result[#result + 1] = redis.call('PTTL', key)
+end
+return result
+"""
+
+PERIODS = {
+    'second': 1,
+    'minute': 60,
+    'hour': 3600,
+    'day': 86400
+}
+
+
+def parse_limit(limit):
+    """Parse a limit string such as '50 per hour' into (amount, window_seconds)."""
+    amount, _, period = limit.partition(' per ')
+    return int(amount), PERIODS[period.strip().rstrip('s')]
+
+
+def get_remote_address():
+    """Default key function: the client's IP address."""
+    return request.remote_addr or '127.0.0.1'
+
+
+class MemoryWindows:
+    """Process-local fixed-window counters, used while Redis is unreachable."""
+
+    # Expired windows are swept once the table grows past this many keys
+    MAX_KEYS = 10000
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+
+    def hit(self, keys, windows_ms):
+        """Same contract as the Lua script: a flat [count, pttl, count, pttl, ...] list."""
+        now = time.monotonic()
+        result = []
+        with self._lock:
+            if len(self._counters) > self.MAX_KEYS:
+                self._counters = {k: v for k, v in self._counters.items() if v[1] > now}
+            for key, window_ms in zip(keys, windows_ms):
+                count, expires_at = self._counters.get(key, (0, 0.0))
+                if expires_at <= now:
+                    count, expires_at = 0, now + window_ms / 1000
+                count += 1
+                self._counters[key] = (count, expires_at)
+                result.extend((count, int((expires_at - now) * 1000)))
+        return result
+
+
+class RateLimiter:
+    """Fixed-window rate limiter applied to every non-exempt endpoint."""
+
+    def __init__(self, redis_client, default_limits, key_func=get_remote_address,
+                 in_memory_fallback_enabled=True):
+        self.redis = redis_client
+        self.default_limits = list(default_limits)
+        self.limits = [parse_limit(limit) for limit in self.default_limits]
+        self.key_func = key_func
+        self.fallback = MemoryWindows() if in_memory_fallback_enabled else None
+        self._exempt_views = set()
+        self._sha = None
+
+    def init_app(self, app):
+        """Load the Lua script and install the before_request check."""
+        if self.redis is None:
+            if self.fallback is None:
+                api_logger.warning("Redis unavailable, rate limiting is disabled.")
+                return
+            api_logger.warning("Redis unavailable, rate limiting uses in-memory counters.")
+        else:
+            try:
+                self._sha = self.redis.script_load(SCRIPT)
+            except RedisError as e:
+                api_logger.error(f"Failed to load rate limit script: {e}")
+        app.before_request(self._check)
+
+    def exempt(self, f):
+        """Decorator to exclude a view function from rate limiting."""
+        self._exempt_views.add(f)
+        return f
+
+    def _hit(self, keys, windows_ms):
+        """Run the script, reloading it if Redis has flushed its script cache."""
+        if self.redis is None:
+            return self.fallback.hit(keys, windows_ms)
+        try:
+            if self._sha is None:
+                raise NoScriptError("script not loaded")
+            return self.redis.evalsha(self._sha, len(keys), *keys, *windows_ms)
+        except NoScriptError:
+            self._sha = self.redis.script_load(SCRIPT)
+            return self.redis.evalsha(self._sha, len(keys), *keys, *windows_ms)
+
+    def _check(self):
+        endpoint = request.endpoint
+        if endpoint is None or current_app.view_functions.get(endpoint) in self._exempt_views:
+            return None
+
+        identity = self.key_func()
+        keys = [f"rl:{identity}:{endpoint}:{window}" for _, window in self.limits]
+        windows_ms = [window * 1000 for _, window in self.limits]
+
+        try:
+            result = self._hit(keys, windows_ms)
+        except RedisError as e:
+            if self.fallback is None:
+                api_logger.error(f"Rate limit check failed, allowing request: {e}")
+                return None
+            api_logger.error(f"Rate limit check failed, using in-memory counters: {e}")
+            result = self.fallback.hit(keys, windows_ms)
+
+        for limit, (amount, _), count, pttl in zip(self.default_limits, self.limits, result[::2], result[1::2]):
+            if count > amount:
+                rate_limit_logger.warning(f"Rate limit '{limit}' exceeded by {identity} on {endpoint}")
+                record_rate_limit(endpoint)
+                retry_after = max(1, ceil(pttl / 1000))
+                return create_response(
+                    {"error": f"Rate limit exceeded: {limit}"}, 429,
+                    {'Retry-After': str(retry_after)}
+                )
+        return None
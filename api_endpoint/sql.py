@@ -0,0 +1,163 @@
+"""
+Shared SQL statements for the Flask API.
+Using the exact same text everywhere lets each pooled connection's statement
+cache reuse the already-parsed cursor instead of soft-parsing again.
+"""
+
+BOOK_COLUMNS = "id, title, author, quantity"
+
+# The fields a user resource exposes; password_hash never leaves the database
+USER_COLUMNS = "id, name, email"
+
+# ORA_ROWSCN versions the row for the ETag, as with SQL_GET_BOOK
+SQL_GET_USER = f"SELECT {USER_COLUMNS}, ora_rowscn FROM users WHERE id = :1"
+
+# A duplicate name is caught inside the block: :updated comes back as -1 instead of
+# an ORA-00001 being raised, unwound and rolled back through the driver
+SQL_UPDATE_USER = """
+    BEGIN
+        UPDATE users SET name = :name WHERE id = :user_id
+        RETURNING name, email INTO :name_out, :email_out;
+        :updated := SQL%ROWCOUNT;
+    EXCEPTION
+        WHEN DUP_VAL_ON_INDEX THEN :updated := -1;
+    END;
+"""
+
+SQL_COUNT_USERS = "SELECT COUNT(*) FROM users"
+
+# COUNT(*) OVER () carries the total on every row, so no separate COUNT is needed
+SQL_LIST_USERS = f"""
+    SELECT {USER_COLUMNS}, COUNT(*) OVER () AS total_items FROM users
+    ORDER BY id
+    OFFSET :offset ROWS FETCH NEXT :limit ROWS ONLY
+"""
+
+SQL_USER_EXISTS = "SELECT id FROM users WHERE id = :1"
+
+# As with SQL_UPDATE_USER, a duplicate name leaves :new_id NULL instead of raising
+SQL_INSERT_USER = """
+    BEGIN
+        INSERT INTO users (name) VALUES (:name) RETURNING id INTO :new_id;
+    EXCEPTION
+        WHEN DUP_VAL_ON_INDEX THEN :new_id := NULL;
+    END;
+"""
+
+SQL_DELETE_USER = "DELETE FROM users WHERE id = :1"
+
+SQL_REGISTER_USER = "INSERT INTO users (name, email, password_hash) VALUES (:1, :2, :3)"
+
+SQL_LOGIN_USER = "SELECT id, password_hash FROM users WHERE email = :1"
+
+SQL_USER_HISTORY = """
+    SELECT
+        br.id, br.book_id, br.user_id,
+        b.title as book_title,
+        br.borrow_date, br.return_date
+    FROM borrow_records br
+    JOIN books b ON br.book_id = b.id
+    WHERE br.user_id = :1
+    ORDER BY br.borrow_date DESC
+"""
+
+# Oracle builds the whole JSON array server-side in one CLOB (NULL when there are no records)
+SQL_BORROW_HISTORY = """
+    SELECT JSON_ARRAYAGG(
+        JSON_OBJECT(
+            'id' VALUE br.id, 'user_id' VALUE br.user_id, 'user_name' VALUE u.name,
+            'book_id' VALUE br.book_id, 'book_title' VALUE b.title,
+            'borrow_date' VALUE br.borrow_date, 'return_date' VALUE br.return_date
+        )
+        ORDER BY br.borrow_date DESC, br.id DESC
+        RETURNING CLOB
+    )
+    FROM borrow_records br
+    JOIN books b ON br.book_id = b.id
+    JOIN users u ON br.user_id = u.id
+"""
+
+# ORA_ROWSCN changes whenever the row is modified, so it doubles as the ETag version
+SQL_GET_BOOK = f"SELECT {BOOK_COLUMNS}, ora_rowscn FROM books WHERE id = :1"
+
+SQL_COUNT_BOOKS = "SELECT COUNT(*) FROM books"
+
+# One page of books serialized by Oracle, HATEOAS links included: the URL pieces
+# are bound in, and the borrow link is left out when the book is out of stock.
+# COUNT(*) OVER () carries the total, so no separate COUNT is needed.
+SQL_LIST_BOOKS_JSON = f"""
+    SELECT JSON_ARRAYAGG(
+               JSON_OBJECT(
+                   'id' VALUE id, 'title' VALUE title, 'author' VALUE author, 'quantity' VALUE quantity,
+                   '_links' VALUE JSON_OBJECT(
+                       'self' VALUE JSON_OBJECT('href' VALUE :self_prefix || id || :self_suffix, 'method' VALUE 'GET'),
+                       'collection' VALUE JSON_OBJECT('href' VALUE :collection_url, 'method' VALUE 'GET'),
+                       'borrow' VALUE CASE WHEN quantity > 0 THEN JSON_OBJECT(
+                           'href' VALUE :borrow_url, 'method' VALUE 'POST',
+                           'schema' VALUE JSON_OBJECT('user_id' VALUE 'integer', 'book_id' VALUE 'integer')
+                       ) END FORMAT JSON
+                       ABSENT ON NULL
+                   )
+               )
+               ORDER BY id
+               RETURNING CLOB
+           ),
+           MAX(total_items)
+    FROM (
+        SELECT {BOOK_COLUMNS}, COUNT(*) OVER () AS total_items FROM books
+        ORDER BY id
+        OFFSET :offset ROWS FETCH NEXT :limit ROWS ONLY
+    )
+"""
+
+SQL_INSERT_BOOK = "INSERT INTO books (title, author, quantity) VALUES (:1, :2, :3) RETURNING id INTO :4"
+
+SQL_UPDATE_BOOK = """
+    UPDATE books
+    SET title = COALESCE(:1, title),
+        author = COALESCE(:2, author),
+        quantity = COALESCE(:3, quantity)
+    WHERE id = :4
+    RETURNING title, author, quantity INTO :5, :6, :7
+"""
+
+SQL_DELETE_BOOK = "DELETE FROM books WHERE id = :1"
+
+# Borrow in one round-trip: the stock check, the user check and the title lookup
+# ride on the UPDATE; when it matches nothing, the block reports why instead.
+# borrow_date is set from SYSTIMESTAMP, so the database clock stamps every record.
+SQL_BORROW_BOOK = """
+    BEGIN
+        UPDATE books SET quantity = quantity - 1
+        WHERE id = :book_id AND quantity > 0
+          AND EXISTS (SELECT 1 FROM users WHERE id = :user_id)
+        RETURNING title INTO :title;
+        :borrowed := SQL%ROWCOUNT;
+        IF :borrowed = 1 THEN
+            INSERT INTO borrow_records (user_id, book_id, borrow_date)
+            VALUES (:user_id, :book_id, SYSTIMESTAMP);
+        ELSE
+            SELECT (SELECT COUNT(*) FROM users WHERE id = :user_id),
+                   (SELECT quantity FROM books WHERE id = :book_id)
+            INTO :user_count, :quantity
+            FROM dual;
+        END IF;
+    END;
+"""
+
+# Return in one round-trip: close the oldest open record for this user and book,
+# then put the copy back on the shelf; stamped by the database clock as well
+SQL_RETURN_BOOK = """
+    BEGIN
+        UPDATE borrow_records SET return_date = SYSTIMESTAMP
+        WHERE id = (
+            SELECT MIN(id) FROM borrow_records
+            WHERE user_id = :user_id AND book_id = :book_id AND return_date IS NULL
+        );
+        :returned := SQL%ROWCOUNT;
+        IF :returned = 1 THEN
+            UPDATE books SET quantity = quantity + 1 WHERE id = :book_id
+            RETURNING title INTO :title;
+        END IF;
+    END;
+"""
@@ -1,10 +1,14 @@
 # project/users.py
 import oracledb
 import hashlib
-import json
-from flask import Blueprint, request, Response, url_for
+import orjson
+from flask import Blueprint, request, Response
 from math import ceil
-from .db import get_db
+from .db import get_db, autocommit
+from .validation import decode_user
+from .sql import SQL_GET_USER, SQL_UPDATE_USER, SQL_COUNT_USERS, SQL_LIST_USERS, SQL_USER_EXISTS, SQL_INSERT_USER, SQL_DELETE_USER, SQL_USER_HISTORY
+from .cache import (USER_CACHE_TTL, user_key, users_page_field, get_cached_body, cache_body, get_cached_user_page,
+                    cache_user_page, invalidate_user, invalidate_user_pages, invalidate_history)
 from .helper import * # Assumes helper.py is now in the same directory
 
 bp = Blueprint('users', __name__)
@@ -20,25 +24,26 @@ def get_all_users():
     except ValueError:
         return create_response({"error": "Invalid 'page' or 'limit'. Must be positive integers."}, 400)
 
+    # Every user write drops all cached pages, so a cached page is never stale
+    page_field = users_page_field('v1', page, limit)
+    header = {'Cache-Control': 'public, max-age=300'}
+    cached = get_cached_user_page(page_field)
+    if cached:
+        etag, body = cached
+        return etag_response(body, etag, header)
+
     offset = (page - 1) * limit
     db = get_db()
     
     try:
-        with db.cursor() as cursor:
-            cursor.execute('SELECT COUNT(*) FROM users')
-            total_items = cursor.fetchone()[0]
+        # Sized to the page so the whole page comes back in one round-trip
+        with tuned_cursor(db, limit) as cursor:
+            total_items, users = fetch_counted_page(cursor, SQL_LIST_USERS, {'offset': offset, 'limit': limit},
+                                                    SQL_COUNT_USERS)
             if total_items == 0:
                 return create_response({'data': [], 'total_items': 0}, 200)
 
             total_pages = ceil(total_items / limit)
-
-            query = """
-                SELECT * FROM users 
-                ORDER BY id 
-                OFFSET :offset ROWS FETCH NEXT :limit ROWS ONLY
-            """
-            cursor.execute(query, {'offset': offset, 'limit': limit})
-            users = rows_to_dicts(cursor)
             
             # This helper MUST be updated. See notes below.
             users = [add_user_links(user) for user in users]
@@ -50,14 +55,16 @@ def get_all_users():
                 'data': users
             }
 
-            # url_for MUST be namespaced with the blueprint name: 'users.get_all_users'
+            # Endpoint names MUST be namespaced with the blueprint name: 'users.get_all_users'
             if page < total_pages:
-                response_data['next_page_url'] = url_for('users.get_all_users', page=page + 1, limit=limit, _external=True)
+                response_data['next_page_url'] = page_url('users.get_all_users', page=page + 1, limit=limit)
             if page > 1:
-                response_data['prev_page_url'] = url_for('users.get_all_users', page=page - 1, limit=limit, _external=True)
+                response_data['prev_page_url'] = page_url('users.get_all_users', page=page - 1, limit=limit)
 
-            header = {'Cache-Control': 'public, max-age=300'}
-            return create_response(response_data, 200, header)
+            body = orjson.dumps(response_data)
+            etag = body_etag(body)
+            cache_user_page(page_field, etag, body.decode('utf-8'))
+            return etag_response(body, etag, header)
             
     except oracledb.Error as e:
         return create_response({"error": f"Database error: {e}"}, 500)
@@ -66,49 +73,62 @@ def get_all_users():
 @bp.route('/<int:user_id>', methods=['GET'])
 def get_user_by_id(user_id):
     """Fetches a single user by their ID."""
+    cached = get_cached_body(user_key(user_id))
+    if cached:
+        etag, body = cached
+        matched = matched_etag(etag)
+        if matched:
+            return not_modified(matched)
+        return create_body_response(body, 200, resource_headers(etag))
+
     db = get_db()
     with db.cursor() as cursor:
-        cursor.execute('SELECT * FROM users WHERE id = :1', (user_id,))
-        user_list = rows_to_dicts(cursor)
+        cursor.execute(SQL_GET_USER, (user_id,))
+        user = row_to_dict(cursor)
 
-    if len(user_list) == 0:
+    if user is None:
         return create_response({"error": "User not found"}, 404)
-    
-    # This helper MUST be updated. See notes below.
-    user = add_user_links(user_list[0])
 
-    if not user:
-        return create_response({"error": "User not found"}, 404)
+    # The ETag only depends on the id and the row's SCN, so an unchanged
+    # user is answered with 304 before any links or JSON are built.
+    etag_src = f"{user_id}:{user.pop('ora_rowscn')}".encode('utf-8')
+    etag = hashlib.blake2b(etag_src, digest_size=16).hexdigest()
 
-    user_json_str = json.dumps(user, sort_keys=True).encode('utf-8')
-    etag = hashlib.sha1(user_json_str).hexdigest()
+    matched = matched_etag(etag)
+    if matched:
+        return not_modified(matched)
 
-    if request.headers.get('If-None-Match') == etag:
-        return Response(status=304)
+    # This helper MUST be updated. See notes below.
+    user = add_user_links(user)
+    body = orjson.dumps(user, option=orjson.OPT_SORT_KEYS)
 
-    headers = {'ETag': etag}
-    return create_response(user, 200, headers)
+    headers = resource_headers(etag)
+    cache_body(user_key(user_id), etag, body.decode('utf-8'), USER_CACHE_TTL)
+    return create_body_response(body, 200, headers)
 
 
 @bp.route('', methods=['POST'])
 def add_user():
     """Adds a new user."""
     # ... (code for add_user is identical, no changes needed)
-    data = request.get_json()
-    if not data or 'name' not in data:
-        return create_response({"error": "Missing required field: name"}, 400)
+    user, error = decode_user(request.get_data())
+    if error:
+        return create_response({"error": error}, 400)
 
-    name = data['name']
+    name, = user
     db = get_db()
     try:
         with db.cursor() as cursor:
             new_id_var = cursor.var(oracledb.DB_TYPE_NUMBER)
-            cursor.execute('INSERT INTO users (name) VALUES (:name) RETURNING id INTO :new_id',
-                           {'name': name, 'new_id': new_id_var})
-            new_user_id = int(new_id_var.getvalue()[0])
-            db.commit()
-            new_user = {"id": new_user_id, "name": name}
-            return create_response(new_user, 201)
+            with autocommit(db):
+                cursor.execute(SQL_INSERT_USER,
+                               {'name': name, 'new_id': new_id_var})
+            if new_id_var.getvalue() is None:
+                return create_response({"error": "User with this name already exists"}, 409)
+            new_user_id = int(new_id_var.getvalue())
+        invalidate_user_pages()
+        new_user = {"id": new_user_id, "name": name}
+        return create_response(new_user, 201)
     except oracledb.IntegrityError:
         db.rollback()
         return create_response({"error": "User with this name already exists"}, 409)
@@ -122,21 +142,35 @@ def update_user(user_id):
     """Updates an existing user's details."""
     # ... (code for update_user is identical, no changes needed)
     db = get_db()
-    data = request.get_json()
-    if not data or 'name' not in data:
-        return create_response({"error": "Missing required field: name"}, 400)
+    user, error = decode_user(request.get_data())
+    if error:
+        return create_response({"error": error}, 400)
 
-    name = data['name']
+    name, = user
     try:
         with db.cursor() as cursor:
-            cursor.execute('UPDATE users SET name = :1 WHERE id = :2', (name, user_id))
-            if cursor.rowcount == 0:
+            # RETURNING hands back the updated row, so no second SELECT is needed
+            name_var = cursor.var(oracledb.DB_TYPE_VARCHAR)
+            email_var = cursor.var(oracledb.DB_TYPE_VARCHAR)
+            updated_var = cursor.var(oracledb.DB_TYPE_NUMBER)
+            with autocommit(db):
+                cursor.execute(SQL_UPDATE_USER, {
+                    'name': name, 'user_id': user_id,
+                    'name_out': name_var, 'email_out': email_var, 'updated': updated_var
+                })
+            updated = updated_var.getvalue()
+            if updated == 0:
                 return create_response({"error": "User not found"}, 404)
-            db.commit()
-
-        with db.cursor() as cursor:
-             cursor.execute('SELECT * FROM users WHERE id = :1', (user_id,))
-             updated_user = rows_to_dicts(cursor)[0]
+            if updated == -1:
+                return create_response({"error": "User with this name already exists"}, 409)
+        invalidate_user(user_id)
+        invalidate_history()
+
+        updated_user = {
+            "id": user_id,
+            "name": name_var.getvalue(),
+            "email": email_var.getvalue()
+        }
         return create_response(updated_user, 200)
 
     except oracledb.IntegrityError:
@@ -153,10 +187,12 @@ def delete_user(user_id):
     # ... (code for delete_user is identical, no changes needed)
     db = get_db()
     with db.cursor() as cursor:
-        cursor.execute('DELETE FROM users WHERE id = :1', (user_id,))
+        with autocommit(db):
+            cursor.execute(SQL_DELETE_USER, (user_id,))
         if cursor.rowcount == 0:
             return create_response({"error": "User not found"}, 404)
-    db.commit()
+    invalidate_user(user_id)
+    invalidate_history()
     return create_response({"message": f"User with id {user_id} has been deleted."}, 200)
 
 
@@ -165,29 +201,20 @@ def get_user_borrow_history(user_id):
     """Retrieves the borrow history for a specific user."""
     db = get_db()
 
-    with db.cursor() as cursor:
-        cursor.execute('SELECT id FROM users WHERE id = :1', (user_id,))
-        if not cursor.fetchone():
-            return create_response({"error": "User not found"}, 404)
-
-    query = """
-        SELECT
-            br.id, br.book_id, br.user_id,
-            b.title as book_title,
-            br.borrow_date, br.return_date
-        FROM borrow_records br
-        JOIN books b ON br.book_id = b.id
-        WHERE br.user_id = :1
-        ORDER BY br.borrow_date DESC
-    """
-    with db.cursor() as cursor:
-        cursor.execute(query, (user_id,))
+    # One cursor for both statements; the user only needs to be looked up
+    # when there is no history to prove it exists
+    with tuned_cursor(db) as cursor:
+        cursor.execute(SQL_USER_HISTORY, (user_id,))
         records = rows_to_dicts(cursor)
 
-    if len(records) == 0:
-        return create_response({"message": "No borrow history found for this user"}, 201)
+        if len(records) == 0:
+            cursor.execute(SQL_USER_EXISTS, (user_id,))
+            if not cursor.fetchone():
+                return create_response({"error": "User not found"}, 404)
+            return create_response({"message": "No borrow history found for this user"}, 201)
 
     # This helper MUST be updated. See notes below.
     # records = [add_borrow_record_links(rec) for rec in records]
 
-    return create_response(records, 200)
\ No newline at end of file
+    body = orjson.dumps(records)
+    return etag_response(body, body_etag(body), HISTORY_HEADERS)
\ No newline at end of file
@@ -0,0 +1,123 @@
+"""
+Request body validation for the Flask API.
+Each payload shape is a msgspec Struct with a decoder compiled once at import,
+so a raw request body is parsed and type-checked in a single C-level pass.
+Decoders are lax (strict=False), so numeric strings such as "5" are still
+coerced to integers, and map msgspec's errors back to the API's own messages.
+They return (values, None) on success or (None, error message) on failure,
+so every route reports the same errors.
+"""
+from typing import Optional
+import msgspec
+from msgspec import UNSET, UnsetType
+
+INVALID_TYPES = "Invalid data types for fields"
+INVALID_JSON = "Request body must be valid JSON"
+
+
+# Required fields default to UNSET, so a missing field is reported with the
+# payload's own message instead of msgspec's
+class BookIn(msgspec.Struct):
+    title: str | UnsetType = UNSET
+    author: str | UnsetType = UNSET
+    quantity: int | UnsetType = UNSET
+
+
+class BookPatchIn(msgspec.Struct):
+    # Fields left out stay None, so SQL_UPDATE_BOOK's COALESCE keeps the current value
+    title: Optional[str] = None
+    author: Optional[str] = None
+    quantity: Optional[int] = None
+
+
+class UserIn(msgspec.Struct):
+    name: str | UnsetType = UNSET
+
+
+class RegisterIn(msgspec.Struct):
+    name: str | UnsetType = UNSET
+    email: str | UnsetType = UNSET
+    password: str | UnsetType = UNSET
+
+
+class LoginIn(msgspec.Struct):
+    email: str | UnsetType = UNSET
+    password: str | UnsetType = UNSET
+
+
+class BorrowIn(msgspec.Struct):
+    user_id: int | UnsetType = UNSET
+    book_id: int | UnsetType = UNSET
+
+
+def _check_quantity(fields):
+    """Rejects a negative quantity, the last field of a book payload."""
+    quantity = fields[-1]
+    if quantity is not None and quantity < 0:
+        return "Quantity cannot be negative"
+    return None
+
+
+def _compile(payload_type, missing, check=None):
+    """
+    Builds a decoder turning raw body bytes into a tuple of the payload's fields.
+    `missing` is reported when the body is not an object or lacks a required field;
+    `check`, if given, may return an error for the decoded fields.
+    """
+    decoder = msgspec.json.Decoder(payload_type, strict=False)
+
+    def decode(raw):
+        try:
+            fields = msgspec.structs.astuple(decoder.decode(raw))
+        except msgspec.ValidationError as e:
+            # Errors inside the object carry a field path; any other means it was not an object
+            return None, INVALID_TYPES if " - at `$." in str(e) else missing
+        except msgspec.DecodeError:
+            return None, INVALID_JSON
+        if any(field is UNSET for field in fields):
+            return None, missing
+        error = check(fields) if check else None
+        if error:
+            return None, error
+        return fields, None
+
+    return decode
+
+
+# (title, author, quantity), ready to bind
+decode_book = _compile(BookIn, "Missing required fields: title, author, quantity", _check_quantity)
+# (title, author, quantity), None where the field was left out
+decode_book_patch = _compile(BookPatchIn, "Request body cannot be empty", _check_quantity)
+# (name,)
+decode_user = _compile(UserIn, "Missing required field: name")
+# (name, email, password)
+decode_register = _compile(RegisterIn, "Missing name, email, or password")
+# (email, password)
+decode_login = _compile(LoginIn, "Missing email or password")
+# (user_id, book_id), for both borrowing and returning
+decode_borrow = _compile(BorrowIn, "Missing user_id or book_id")
+
+_raw_list_decoder = msgspec.json.Decoder(list[msgspec.Raw])
+
+
+def decode_books(raw):
+    """
+    Decodes a batch of books into [(title, author, quantity), ...]. Each element is
+    checked by decode_book, so errors name the failing index as they always have.
+    """
+    try:
+        items = _raw_list_decoder.decode(raw)
+    except msgspec.ValidationError:
+        items = None
+    except msgspec.DecodeError:
+        return None, INVALID_JSON
+    if not items:
+        return None, "Request body must be a non-empty array of books"
+
+    rows = []
+    for index, item in enumerate(items):
+        book, error = decode_book(item)
+        if error:
+            return None, f"Book at index {index}: {error}"
+        rows.append(book)
+    return rows, None
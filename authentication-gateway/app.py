@@ -1,5 +1,9 @@
 import os
+import time
+import functools
+from http.cookiejar import DefaultCookiePolicy
 import requests
+from requests.adapters import HTTPAdapter
 import jwt
 from dotenv import load_dotenv # type: ignore
 from flask import Flask, request, jsonify, Response, stream_with_context
@@ -16,6 +20,18 @@ SECRET_KEY = os.environ.get('SECRET_KEY')
 if not FORWARD_URL or not SECRET_KEY:
     raise RuntimeError("FORWARD_URL and/or SECRET_KEY environment variables are not set.")
 
+# --- Upstream Connection Pool ---
+# One Session per worker keeps connections to FORWARD_URL alive, so a proxied
+# request no longer pays a TCP (and TLS) handshake every time.
+SESSION = requests.Session()
+# The session is shared by every client, so it must never store their cookies
+SESSION.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+_adapter = HTTPAdapter(pool_connections=32, pool_maxsize=256, max_retries=0)
+SESSION.mount('http://', _adapter)
+SESSION.mount('https://', _adapter)
+# Bodies are relayed still encoded, so only ask upstream for gzip when the client did
+del SESSION.headers['Accept-Encoding']
+
 # --- Public Routes ---
 # Define the exact paths that should bypass JWT validation.
 # The 'path' variable from Flask will not include a leading slash.
@@ -26,8 +42,28 @@ PUBLIC_PATHS = [
     'api/v1/login'          # The v1 login route
 ]
 
+# --- Proxied Headers ---
+# Built once, lowercased, so filtering headers is one set lookup per header.
+# Host must be the upstream's own, not the address the client used for the gateway.
+EXCLUDED_REQUEST_HEADERS = frozenset({'host'})
+# Exclude headers that are set by the proxy/WSGI server. Content-Encoding is kept:
+# the body is relayed exactly as the upstream encoded it.
+EXCLUDED_RESPONSE_HEADERS = frozenset({'content-length', 'transfer-encoding', 'connection'})
+
+# Large reads keep the per-chunk Python overhead low on big list responses
+PROXY_CHUNK_SIZE = 64 * 1024
+
 # --- JWT Validation Logic ---
 
+@functools.lru_cache(maxsize=4096)
+def _decode_cached(token):
+    """
+    Verifies a token's signature and returns its claims. Clients resend the same
+    token on every request, so each distinct token is only decoded once; its
+    expiry is left to validate_jwt, which checks it on every use.
+    """
+    return jwt.decode(token, SECRET_KEY, algorithms=['HS256'], options={'verify_exp': False})
+
 def validate_jwt(auth_header):
     """
     Validates a JWT from the 'Authorization: Bearer <token>' header.
@@ -38,9 +74,12 @@ def validate_jwt(auth_header):
     
     token = auth_header.split(" ")[1]
     
-    # Decode the token. This automatically checks the signature and expiration.
-    # An error will be raised if invalid.
-    jwt.decode(token, SECRET_KEY, algorithms=['HS256'])
+    # Decode the token (or reuse the cached claims). An error will be raised if invalid.
+    claims = _decode_cached(token)
+    # Cached claims may have expired since they were decoded, so check on every call
+    exp = claims.get('exp')
+    if exp is not None and exp <= time.time():
+        raise jwt.ExpiredSignatureError("Signature has expired")
     return True
 
 # --- Gateway Routing ---
@@ -75,9 +114,10 @@ def gateway(path):
 
     try:
         # Forward the request, using stream=True to handle large/chunked responses
-        forward_headers = {key: value for (key, value) in request.headers if key.lower() != 'host'}
+        forward_headers = {key: value for (key, value) in request.headers.items()
+                           if key.lower() not in EXCLUDED_REQUEST_HEADERS}
         
-        resp = requests.request(
+        resp = SESSION.request(
             method=request.method,
             url=full_url,
             headers=forward_headers,
@@ -91,15 +131,15 @@ def gateway(path):
         # This is a more robust way to forward the response.
         # It streams the content from the upstream service back to the client.
         
-        # Exclude headers that are set by the proxy/WSGI server
-        excluded_headers = ['content-encoding', 'content-length', 'transfer-encoding', 'connection']
         headers = [
             (key, value) for (key, value) in resp.raw.headers.items()
-            if key.lower() not in excluded_headers
+            if key.lower() not in EXCLUDED_RESPONSE_HEADERS
         ]
 
         # Return a new streaming Response
-        return Response(stream_with_context(resp.iter_content(chunk_size=1024)), resp.status_code, headers)
+        # Raw bytes, not decoded: a gzip body from upstream reaches the client as gzip
+        body = resp.raw.stream(PROXY_CHUNK_SIZE, decode_content=False)
+        return Response(stream_with_context(body), resp.status_code, headers)
 
     except requests.exceptions.RequestException as e:
         return jsonify({"message": "Error connecting to the upstream service", "error": str(e)}), 503
@@ -0,0 +1,16 @@
+# Gunicorn settings for the authentication gateway.
+# The gateway only validates a token and waits on the upstream API, so each
+# worker is a gevent loop serving many proxied requests at once.
+import multiprocessing
+
+bind = '0.0.0.0:5000'
+workers = multiprocessing.cpu_count() * 2 + 1
+worker_class = 'gevent'
+worker_connections = 1000
+# Clients reuse their connection to the gateway between requests
+keepalive = 5
+# Matches the upstream timeout, so slow upstream responses are not cut off early
+timeout = 30
+# app.py is not preloaded: gevent must patch sockets and ssl in each worker
+# before requests is imported, or the shared upstream Session would block.
+preload_app = False
@@ -40,7 +40,11 @@ def initialize_database():
                 cur.execute("""
                 CREATE TABLE users (
                     id NUMBER GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
-                    name VARCHAR2(100) UNIQUE NOT NULL
+                    name VARCHAR2(100) UNIQUE NOT NULL,
+                    email VARCHAR2(255),
+                    password_hash VARCHAR2(255),
+                    -- login looks users up by email; the unique index makes that a single probe
+                    CONSTRAINT uq_users_email UNIQUE (email)
                 )
                 """)
 
@@ -60,12 +64,25 @@ def initialize_database():
                     id NUMBER GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
                     user_id NUMBER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
                     book_id NUMBER NOT NULL REFERENCES books(id) ON DELETE CASCADE,
-                    borrow_date TIMESTAMP NOT NULL,
+                    borrow_date TIMESTAMP DEFAULT SYSTIMESTAMP NOT NULL,
                     return_date TIMESTAMP
                 )
                 """)
                 print("All tables created successfully.")
 
+                # --- 2b. Indexes for the hot borrow_records lookups ---
+                print("\nCreating indexes...")
+                # return_book: the open record for a (user, book) pair; also covers the user_id FK
+                cur.execute("CREATE INDEX ix_br_user_book_active ON borrow_records (user_id, book_id, return_date)")
+                # A user's history, newest first, read straight off the index
+                cur.execute("CREATE INDEX ix_br_user_bdate ON borrow_records (user_id, borrow_date DESC)")
+                # ON DELETE CASCADE from books would otherwise scan borrow_records
+                cur.execute("CREATE INDEX ix_br_book ON borrow_records (book_id)")
+                # The global history in (borrow_date DESC, id DESC) order, covering the
+                # borrow_records columns it selects so keyset pages skip the table and the sort
+                cur.execute("CREATE INDEX ix_br_hist ON borrow_records (borrow_date DESC, id DESC, user_id, book_id, return_date)")
+                print("All indexes created successfully.")
+
                 # --- 3. Insert Sample Data (Seeding) ---
                 print("\nInserting sample users...")
                 sample_users = [('Alice',), ('Bob',), ('Charlie',)]
@@ -0,0 +1,92 @@
+import os
+import sys
+import oracledb
+from dotenv import load_dotenv # type: ignore
+
+# Unlike init_db.py, this script never drops anything: it brings an existing
+# schema up to date with the columns, constraints and indexes init_db.py creates,
+# and can be run any number of times.
+
+# --- Database Credentials ---
+# Read from the same .env / environment variables the API uses.
+load_dotenv(os.path.join(os.path.dirname(__file__), '.env'))
+DB_USER = os.getenv("DB_USER")
+DB_PASSWORD = os.getenv("DB_PASSWORD")
+CONNECT_STRING = os.getenv("CONNECT_STRING")
+
+# Each step is (description, DDL, Oracle errors meaning "already applied")
+MIGRATIONS = [
+    # --- users: the columns register/login use, and the login lookup index ---
+    ("users.email column",
+     "ALTER TABLE users ADD (email VARCHAR2(255))",
+     ("ORA-01430",)),  # column being added already exists in table
+    ("users.password_hash column",
+     "ALTER TABLE users ADD (password_hash VARCHAR2(255))",
+     ("ORA-01430",)),
+    ("uq_users_email unique constraint",
+     "ALTER TABLE users ADD CONSTRAINT uq_users_email UNIQUE (email)",
+     ("ORA-02261",    # such unique or primary key already exists in the table
+      "ORA-02264",    # name already used by an existing constraint
+      "ORA-00955")),  # name is already used by an existing object (its index)
+
+    # --- borrow_records: database-clock default for borrow_date ---
+    # Re-applying the same default is harmless, so no error needs guarding.
+    ("borrow_records.borrow_date default",
+     "ALTER TABLE borrow_records MODIFY (borrow_date DEFAULT SYSTIMESTAMP)",
+     ()),
+
+    # --- borrow_records: indexes for the hot lookups ---
+    ("ix_br_user_book_active index",
+     "CREATE INDEX ix_br_user_book_active ON borrow_records (user_id, book_id, return_date)",
+     ("ORA-00955",    # name is already used by an existing object
+      "ORA-01408")),  # such column list already indexed
+    ("ix_br_user_bdate index",
+     "CREATE INDEX ix_br_user_bdate ON borrow_records (user_id, borrow_date DESC)",
+     ("ORA-00955", "ORA-01408")),
+    ("ix_br_book index",
+     "CREATE INDEX ix_br_book ON borrow_records (book_id)",
+     ("ORA-00955", "ORA-01408")),
+    ("ix_br_hist index",
+     "CREATE INDEX ix_br_hist ON borrow_records (borrow_date DESC, id DESC, user_id, book_id, return_date)",
+     ("ORA-00955", "ORA-01408")),
+]
+
+
+def migrate_database():
+    """
+    Connects to the Oracle database and applies every migration step that is
+    not already in place. DDL commits implicitly, so each step stands on its own.
+    """
+    if not DB_USER or not DB_PASSWORD or not CONNECT_STRING:
+        print("DB_USER, DB_PASSWORD and CONNECT_STRING must be set.", file=sys.stderr)
+        sys.exit(1)
+
+    try:
+        print("Connecting to the database...")
+        with oracledb.connect(user=DB_USER, password=DB_PASSWORD, dsn=CONNECT_STRING) as connection:
+            with connection.cursor() as cur:
+                print("Connected to the database.\n")
+                for description, ddl, already_applied in MIGRATIONS:
+                    try:
+                        cur.execute(ddl)
+                        print(f"  - {description}: applied.")
+                    except oracledb.DatabaseError as e:
+                        error, = e.args
+                        if error.full_code in already_applied:
+                            print(f"  - {description}: already in place, skipping.")
+                        else:
+                            raise
+                print("\nMigration complete.")
+
+    except oracledb.Error as e:
+        print(f"Database error occurred: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+# --- Script Execution ---
+if __name__ == "__main__":
+    # If your environment requires Oracle Thick mode, uncomment the following line.
+    # It must be called before making any connections.
+    # oracledb.init_oracle_client()
+
+    migrate_database()
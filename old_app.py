@@ -2,10 +2,10 @@ import oracledb
 import os
 import hashlib
 import jwt
-import json
+import orjson
 from dotenv import load_dotenv # type: ignore
 from flask import Flask, request, g, jsonify, Response, url_for
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from functools import wraps
 from old_helper import *
 from math import ceil
@@ -28,15 +28,22 @@ if not app.config['SECRET_KEY']:
     raise RuntimeError("SECRET_KEY environment variable is not set.")
 
 # --- Connection Pool Setup ---
+# Fetch CLOB columns as plain strings instead of LOB locators that need extra round-trips
+oracledb.defaults.fetch_lobs = False
+
 try:
     pool = oracledb.create_pool(
         user=DB_USER,
         password=DB_PASSWORD,
         dsn=CONNECT_STRING,
-        min=1,          # keep 1 idle connection
-        max=5,          # up to 5 concurrent connections
-        increment=1,    # grow by 1 when needed
-        timeout=60      # close unused after 60s
+        min=4,              # keep 4 warm sessions so requests skip the TLS + auth handshake
+        max=16,             # up to 16 concurrent connections
+        increment=2,        # grow by 2 when needed
+        timeout=0,          # never close idle sessions
+        getmode=oracledb.POOL_GETMODE_TIMEDWAIT,
+        wait_timeout=2000,  # wait up to 2s for a free session when the pool is full
+        ping_interval=60,   # check sessions idle for over 60s before handing them out
+        stmtcachesize=40    # keep the hot statements parsed on each session
     )
 except oracledb.Error as e:
     print("Error creating connection pool:", e)
@@ -114,9 +121,10 @@ def login():
 
     if check_password_hash(user['password_hash'], password):
         # Password is correct, generate JWT
+        now = datetime.now(timezone.utc)
         payload = {
-            'exp': datetime.utcnow() + timedelta(hours=24), # Expiration time
-            'iat': datetime.utcnow(), # Issued at time
+            'exp': now + timedelta(hours=24), # Expiration time
+            'iat': now, # Issued at time
             'sub': str(user['id']) # Subject (the user's ID)
         }
         token = jwt.encode(
@@ -159,7 +167,7 @@ def get_all_users():
             # 3. Fetch the requested page of books using OFFSET and FETCH
             # SQL syntax for pagination
             query = """
-                SELECT * FROM users 
+                SELECT id, name, email FROM users
                 ORDER BY id 
                 OFFSET :offset ROWS FETCH NEXT :limit ROWS ONLY
             """
@@ -194,7 +202,7 @@ def get_user_by_id(user_id):
     """Fetches a single user by their ID."""
     db = get_db()
     with db.cursor() as cursor:
-        cursor.execute('SELECT * FROM users WHERE id = :1', (user_id,))
+        cursor.execute('SELECT id, name, email FROM users WHERE id = :1', (user_id,))
         user_list = rows_to_dicts(cursor)
 
     if len(user_list) == 0:
@@ -205,8 +213,9 @@ def get_user_by_id(user_id):
     if not user:
         return create_response({"error": "User not found"}, 404)
 
-    user_json_str = json.dumps(user, sort_keys=True).encode('utf-8')
-    etag = hashlib.sha1(user_json_str).hexdigest()
+    # Serialize once: the same bytes are hashed for the ETag and sent as the body
+    user_json_str = orjson.dumps(user, option=orjson.OPT_SORT_KEYS)
+    etag = hashlib.blake2b(user_json_str, digest_size=16).hexdigest()
 
     # Check if client's ETag matches the current one
     if request.headers.get('If-None-Match') == etag:
@@ -216,7 +225,7 @@ def get_user_by_id(user_id):
 
     headers = {'ETag': etag}
 
-    return create_response(user, 200, headers)
+    return create_body_response(user_json_str, 200, headers)
 
 
 @app.route('/users', methods=['POST'])
@@ -256,14 +265,15 @@ def update_user(user_id):
     name = data['name']
     try:
         with db.cursor() as cursor:
-            cursor.execute('UPDATE users SET name = :1 WHERE id = :2', (name, user_id))
+            # RETURNING hands back the updated row, so no second SELECT is needed
+            email_var = cursor.var(oracledb.DB_TYPE_VARCHAR)
+            cursor.execute('UPDATE users SET name = :1 WHERE id = :2 RETURNING email INTO :3',
+                           (name, user_id, email_var))
             if cursor.rowcount == 0:
                 return create_response({"error": "User not found"}, 404)
             db.commit()
 
-        with db.cursor() as cursor:
-             cursor.execute('SELECT * FROM users WHERE id = :1', (user_id,))
-             updated_user = rows_to_dicts(cursor)[0]
+        updated_user = {"id": user_id, "name": name, "email": email_var.getvalue()[0]}
         return create_response(updated_user, 200)
 
     except oracledb.IntegrityError:
@@ -318,7 +328,7 @@ def get_all_books():
             # 3. Fetch the requested page of books using OFFSET and FETCH
             # SQL syntax for pagination
             query = """
-                SELECT * FROM books 
+                SELECT id, title, author, quantity FROM books
                 ORDER BY id 
                 OFFSET :offset ROWS FETCH NEXT :limit ROWS ONLY
             """
@@ -352,7 +362,7 @@ def get_book_by_id(book_id):
     """Fetches a single book by its ID."""
     db = get_db()
     with db.cursor() as cursor:
-        cursor.execute('SELECT * FROM books WHERE id = :1', (book_id,))
+        cursor.execute('SELECT id, title, author, quantity FROM books WHERE id = :1', (book_id,))
         book_list = rows_to_dicts(cursor)
     if not book_list:
         return create_response({"error": "Book not found"}, 404)
@@ -362,8 +372,9 @@ def get_book_by_id(book_id):
     book = add_book_links(book_list[0])
 
     # Generate ETag from a stable JSON representation of the book data
-    book_json_str = json.dumps(book, sort_keys=True).encode('utf-8')
-    etag = hashlib.sha1(book_json_str).hexdigest()
+    # Serialize once: the same bytes are hashed for the ETag and sent as the body
+    book_json_str = orjson.dumps(book, option=orjson.OPT_SORT_KEYS)
+    etag = hashlib.blake2b(book_json_str, digest_size=16).hexdigest()
 
     # Check if client's ETag matches the current one
     if request.headers.get('If-None-Match') == etag:
@@ -373,7 +384,7 @@ def get_book_by_id(book_id):
         'ETag': etag
     }
 
-    return create_response(book, 200, headers)
+    return create_body_response(book_json_str, 200, headers)
 
 
 @app.route('/books', methods=['POST'])
@@ -409,32 +420,37 @@ def add_book():
 @app.route('/books/<int:book_id>', methods=['PUT'])
 def update_book(book_id):
     """Updates an existing book's details."""
-    db = get_db()
-    book_to_update = db.cursor()
-    book_to_update.execute('SELECT * FROM books WHERE id = :1', (book_id,))
-    existing_book_data = rows_to_dicts(book_to_update)
-    book_to_update.close()
-
-    if not existing_book_data:
-        return create_response({"error": "Book not found"}, 404)
-
     data = request.get_json()
     if not data:
         return create_response({"error": "Request body cannot be empty"}, 400)
 
-    title = data.get('title', existing_book_data[0]['title'])
-    author = data.get('author', existing_book_data[0]['author'])
-    quantity = data.get('quantity', existing_book_data[0]['quantity'])
-
-    with db.cursor() as cursor:
-        cursor.execute('UPDATE books SET title = :1, author = :2, quantity = :3 WHERE id = :4',
-                       (title, author, quantity, book_id))
-    db.commit()
-
+    # Fields left out of the body are passed as NULL so COALESCE keeps the
+    # current value; RETURNING hands back the updated row in the same round-trip.
+    db = get_db()
     with db.cursor() as cursor:
-        cursor.execute('SELECT * FROM books WHERE id = :1', (book_id,))
-        updated_book = rows_to_dicts(cursor)[0]
-
+        title_var = cursor.var(oracledb.DB_TYPE_VARCHAR)
+        author_var = cursor.var(oracledb.DB_TYPE_VARCHAR)
+        quantity_var = cursor.var(oracledb.DB_TYPE_NUMBER)
+        cursor.execute(
+            """UPDATE books
+               SET title = COALESCE(:1, title),
+                   author = COALESCE(:2, author),
+                   quantity = COALESCE(:3, quantity)
+               WHERE id = :4
+               RETURNING title, author, quantity INTO :5, :6, :7""",
+            (data.get('title'), data.get('author'), data.get('quantity'),
+             book_id, title_var, author_var, quantity_var))
+        if cursor.rowcount == 0:
+            return create_response({"error": "Book not found"}, 404)
+        db.commit()
+
+    quantity = quantity_var.getvalue()[0]
+    updated_book = {
+        "id": book_id,
+        "title": title_var.getvalue()[0],
+        "author": author_var.getvalue()[0],
+        "quantity": int(quantity) if quantity is not None else None
+    }
     return create_response(updated_book, 200)
 
 
@@ -1,21 +1,7 @@
-from flask import jsonify, make_response, url_for
-
-# --- Helper Function for JSON Responses ---
-def create_response(data, status_code, headers=None):
-    """Creates a Flask JSON response."""
-    response = jsonify(data)
-    response.status_code = status_code
-    if headers:
-        for key, value in headers.items():
-            response.headers[key] = value
-    return response
-
-# --- Helper to convert Oracle rows to Dictionaries ---
-def rows_to_dicts(cursor):
-    """Converts cursor results to a list of dictionaries."""
-    # Column names need to be lowercase for consistent JSON keys
-    columns = [col[0].lower() for col in cursor.description]
-    return [dict(zip(columns, row)) for row in cursor]
+from flask import url_for
+# Response and row helpers have one implementation, shared with the blueprint API;
+# only the link helpers below differ, as they target old_app's unprefixed endpoints
+from api_endpoint.jsonresp import create_response, create_body_response, rows_to_dicts
 
 # --- HATEOAS Link Generation Helpers ---
 
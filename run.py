@@ -16,6 +16,6 @@ if __name__ == '__main__':
     # Get host and port from environment or use defaults
     HOST = os.environ.get('FLASK_RUN_HOST', '127.0.0.1')
     PORT = int(os.environ.get('FLASK_RUN_PORT', 5000))
-    DEBUG = os.environ.get('FLASK_DEBUG', 'True').lower() in ('true', '1', 't')
+    DEBUG = os.environ.get('FLASK_DEBUG', 'False').lower() in ('true', '1', 't')
     
     app.run(host=HOST, port=PORT, debug=DEBUG)
\ No newline at end of file
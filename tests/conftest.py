@@ -0,0 +1,289 @@
+"""
+Fixtures for running the blueprint API through Flask's test client without
+Oracle or Redis. create_app() is built unchanged; only the two clients it
+creates are swapped for in-process doubles:
+
+- FakeDB answers each SQL statement with the handler a test registers for it,
+  so a test states exactly what Oracle would have returned. Connections report
+  thin mode like the real pool's, so pipelines run through the same handlers.
+- FakeRedis keeps strings and hashes in dicts and runs the rate limit script
+  through ratelimit.MemoryWindows, which implements the same contract.
+"""
+import os
+import re
+import tempfile
+
+import oracledb
+import pytest
+import redis
+
+os.environ.setdefault('SECRET_KEY', 'test-secret-' + 'k' * 64)
+os.environ.setdefault('DB_USER', 'library')
+os.environ.setdefault('DB_PASSWORD', 'library')
+os.environ.setdefault('CONNECT_STRING', 'localhost/FREEPDB1')
+os.environ.setdefault('DB_POOL_MIN', '1')
+# The log files are opened when api_endpoint.logger is first imported, which
+# collecting the test modules already does, so this cannot wait for a fixture
+os.environ.setdefault('LOG_DIR', tempfile.mkdtemp(prefix='library-api-logs-'))
+
+from api_endpoint import create_app  # noqa: E402
+from api_endpoint.ratelimit import MemoryWindows  # noqa: E402
+
+
+# --- Oracle double ---
+
+class FakeVar:
+    """Bind variable created by cursor.var(); handlers fill it with setvalue()."""
+
+    def __init__(self):
+        self.value = None
+
+    def getvalue(self, pos=0):
+        return self.value
+
+    def setvalue(self, pos, value):
+        self.value = value
+
+
+class FakeCursor:
+    def __init__(self, db):
+        self.db = db
+        self.description = None
+        self.rowfactory = None
+        self.rowcount = 0
+        self.arraysize = 100
+        self.prefetchrows = 2
+        self._rows = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        pass
+
+    def var(self, db_type):
+        return FakeVar()
+
+    def execute(self, sql, params=None):
+        self.db.executed.append(sql)
+        handler = self.db.handler_for(sql)
+        # python-oracledb resets rowfactory on every execute
+        self.rowfactory = None
+        self.description = None
+        self._rows = []
+        self.rowcount = 0
+        handler(self, params)
+
+    def set_rows(self, columns, rows):
+        """Called by handlers: the result set the statement produced."""
+        self.description = [(name.upper(),) for name in columns]
+        self._rows = list(rows)
+        self.rowcount = len(self._rows)
+
+    def _make(self, row):
+        return self.rowfactory(*row) if self.rowfactory else row
+
+    def fetchone(self):
+        if not self._rows:
+            return None
+        return self._make(self._rows.pop(0))
+
+    def fetchmany(self, size=None):
+        size = size or self.arraysize
+        batch, self._rows = self._rows[:size], self._rows[size:]
+        return [self._make(row) for row in batch]
+
+    def fetchall(self):
+        rows, self._rows = self._rows, []
+        return [self._make(row) for row in rows]
+
+
+class FakeColumn:
+    """The FetchInfo fields a pipeline result's columns expose."""
+
+    def __init__(self, name):
+        self.name = name
+
+
+class FakePipelineResult:
+    def __init__(self, description, rows):
+        self.columns = [FakeColumn(col[0]) for col in description or ()]
+        self.rows = rows
+
+
+class FakeConnection:
+    def __init__(self, db):
+        self.db = db
+        self.thin = db.thin
+        self.autocommit = False
+
+    def cursor(self):
+        return FakeCursor(self.db)
+
+    def run_pipeline(self, pipeline):
+        """Runs each fetch queued on a real oracledb pipeline through the registered handlers."""
+        self.db.pipelines += 1
+        results = []
+        for op in pipeline.operations:
+            cursor = self.cursor()
+            cursor.execute(op.statement, op.parameters)
+            if op.op_type == oracledb.PipelineOpType.FETCH_ONE:
+                row = cursor.fetchone()
+                rows = [row] if row is not None else []
+            elif op.op_type == oracledb.PipelineOpType.FETCH_ALL:
+                rows = cursor.fetchall()
+            else:
+                raise AssertionError(f"unexpected pipeline operation: {op.op_type!r}")
+            results.append(FakePipelineResult(cursor.description, rows))
+        return results
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        self.db.rollbacks += 1
+
+
+class FakePool:
+    def __init__(self, db):
+        self.db = db
+
+    def acquire(self):
+        return FakeConnection(self.db)
+
+    def release(self, connection):
+        pass
+
+
+def _normalize(sql):
+    return re.sub(r'\s+', ' ', sql).strip()
+
+
+class FakeDB:
+    """Maps each SQL statement to handler(cursor, params) and records what ran."""
+
+    def __init__(self):
+        self.handlers = {}
+        self.fragments = []
+        self.executed = []
+        self.rollbacks = 0
+        self.pipelines = 0
+        self.pool_kwargs = None
+        # The app never calls init_oracle_client(), so its sessions are thin
+        self.thin = True
+
+    def on(self, sql, handler):
+        self.handlers[sql] = handler
+
+    def on_fragment(self, fragment, handler):
+        """Registers a handler for statements built at runtime, matched by a piece of their text."""
+        self.fragments.append((_normalize(fragment), handler))
+
+    def handler_for(self, sql):
+        if sql in self.handlers:
+            return self.handlers[sql]
+        text = _normalize(sql)
+        for fragment, handler in self.fragments:
+            if fragment in text:
+                return handler
+        raise AssertionError(f"unexpected SQL: {sql!r}")
+
+    def rows(self, sql, columns, rows):
+        """Registers a statement that always returns the same result set."""
+        self.on(sql, lambda cursor, params: cursor.set_rows(columns, rows))
+
+    def count(self, sql):
+        """How many times `sql` was executed."""
+        return self.executed.count(sql)
+
+
+# --- Redis double ---
+
+class FakePipeline:
+    def __init__(self, client):
+        self.client = client
+        self.calls = []
+
+    def __getattr__(self, name):
+        def queue(*args):
+            self.calls.append((name, args))
+            return self
+        return queue
+
+    def execute(self):
+        return [getattr(self.client, name)(*args) for name, args in self.calls]
+
+
+class FakeRedis:
+    """The subset of redis.Redis (decode_responses=True) used by cache.py and ratelimit.py."""
+
+    def __init__(self, *args, **kwargs):
+        self.data = {}
+        self.windows = MemoryWindows()
+
+    def ping(self):
+        return True
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def setex(self, key, ttl, value):
+        self.data[key] = value
+        return True
+
+    def hget(self, key, field):
+        return self.data.get(key, {}).get(field)
+
+    def hset(self, key, field, value):
+        self.data.setdefault(key, {})[field] = value
+        return 1
+
+    def expire(self, key, ttl):
+        return key in self.data
+
+    def delete(self, *keys):
+        return sum(self.data.pop(key, None) is not None for key in keys)
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    def script_load(self, script):
+        return 'sha'
+
+    def evalsha(self, sha, numkeys, *args):
+        return self.windows.hit(args[:numkeys], args[numkeys:])
+
+
+# --- Fixtures ---
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    db = FakeDB()
+
+    def create_pool(**kwargs):
+        db.pool_kwargs = kwargs
+        return FakePool(db)
+
+    monkeypatch.setattr(oracledb, 'create_pool', create_pool)
+    return db
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    client = FakeRedis()
+    monkeypatch.setattr(redis, 'Redis', lambda *args, **kwargs: client)
+    return client
+
+
+@pytest.fixture
+def app(fake_db, fake_redis):
+    # The production SERVER_NAME would make the test client's requests unroutable
+    return create_app({'TESTING': True, 'SERVER_NAME': None})
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
@@ -0,0 +1,67 @@
+import pytest
+
+BOOKS = [(7, 'Dune', 'Herbert', 2), (9, 'Dune Messiah', 'Herbert', 0)]
+TOTAL = 5
+
+
+@pytest.fixture
+def books_table(fake_db):
+    """Answers both ways books_v2 can fetch a page: windowed, or COUNT and page pipelined."""
+    params = {}
+
+    def windowed(cursor, bound):
+        params['windowed'] = bound
+        rows = BOOKS if bound['offset'] < TOTAL else []
+        cursor.set_rows(('id', 'title', 'author', 'quantity', 'total_items'),
+                        [book + (TOTAL,) for book in rows])
+
+    def count(cursor, bound):
+        params['count'] = bound
+        cursor.set_rows(('count',), [(TOTAL,)])
+
+    def page(cursor, bound):
+        params['page'] = bound
+        rows = BOOKS if bound['offset'] < TOTAL else []
+        cursor.set_rows(('id', 'title', 'author', 'quantity'), rows)
+
+    fake_db.on_fragment('COUNT(*) OVER () AS total_items FROM books', windowed)
+    fake_db.on_fragment('SELECT COUNT(*) FROM books', count)
+    fake_db.on_fragment('SELECT id, title, author, quantity FROM books', page)
+    return params
+
+
+def fetch_both_ways(client, fake_db, fake_redis, url):
+    """The same request served by the pipelined (thin) path and by the windowed one."""
+    responses = {}
+    for thin in (True, False):
+        fake_db.thin = thin
+        fake_redis.data.clear()
+        response = client.get(url)
+        assert response.status_code == 200
+        responses[thin] = response
+    return responses[True], responses[False]
+
+
+def test_pipelined_page_matches_the_windowed_query(client, fake_db, fake_redis, books_table):
+    pipelined, windowed = fetch_both_ways(client, fake_db, fake_redis, '/api/v2/books?title=dune&page=1&limit=2')
+
+    assert fake_db.pipelines == 1
+    assert pipelined.get_json() == windowed.get_json()
+    assert pipelined.headers['ETag'] == windowed.headers['ETag']
+    body = pipelined.get_json()
+    assert body['total_items'] == TOTAL
+    assert body['total_pages'] == 3
+    assert [book['id'] for book in body['data']] == [7, 9]
+    assert set(body['data'][0]) == {'id', 'title', 'author', 'quantity', '_links'}
+    # The COUNT only binds the filter; the page query adds the window
+    assert books_table['count'] == {'title': '%DUNE%'}
+    assert books_table['page'] == {'title': '%DUNE%', 'offset': 0, 'limit': 2}
+
+
+def test_pipelined_page_past_the_end_matches_the_windowed_query(client, fake_db, fake_redis, books_table):
+    pipelined, windowed = fetch_both_ways(client, fake_db, fake_redis, '/api/v2/books?page=4&limit=2')
+
+    assert pipelined.get_json() == windowed.get_json()
+    body = pipelined.get_json()
+    assert body['total_items'] == TOTAL
+    assert body['data'] == []
@@ -0,0 +1,160 @@
+import pytest
+
+from api_endpoint.cache import (BOOK_PAGES_KEY, USER_PAGES_KEY, HISTORY_VARIANTS, book_key, book_etag_key,
+                                user_key, history_key)
+from api_endpoint.sql import (SQL_INSERT_BOOK, SQL_UPDATE_BOOK, SQL_DELETE_BOOK, SQL_INSERT_USER, SQL_UPDATE_USER,
+                              SQL_DELETE_USER, SQL_REGISTER_USER, SQL_LIST_USERS, SQL_BORROW_BOOK, SQL_RETURN_BOOK)
+
+BOOK_KEYS = {book_key(7), book_etag_key(7)}
+USER_KEYS = {user_key(3)}
+HISTORY_KEYS = {history_key(variant) for variant in HISTORY_VARIANTS}
+
+
+@pytest.fixture
+def cached(fake_redis):
+    """Fills every cache a write could touch and returns the keys that were set."""
+    for key in BOOK_KEYS | USER_KEYS | HISTORY_KEYS:
+        fake_redis.setex(key, 60, 'etag\n{}')
+    fake_redis.hset(BOOK_PAGES_KEY, 'v1:1:10', 'etag\n{}')
+    fake_redis.hset(USER_PAGES_KEY, 'v1:1:10', 'etag\n{}')
+    return set(fake_redis.data)
+
+
+def dropped(fake_redis, cached):
+    return cached - set(fake_redis.data)
+
+
+def rowcount(count):
+    def handler(cursor, params):
+        cursor.rowcount = count
+    return handler
+
+
+def test_add_book_drops_only_the_list_pages(client, fake_db, fake_redis, cached):
+    fake_db.on(SQL_INSERT_BOOK, lambda cursor, params: params[3].setvalue(0, [8]))
+
+    response = client.post('/api/v1/books', json={'title': 'Emma', 'author': 'Austen', 'quantity': 1})
+
+    assert response.status_code == 201
+    assert dropped(fake_redis, cached) == {BOOK_PAGES_KEY}
+
+
+def test_update_book_drops_the_book_its_pages_and_history(client, fake_db, fake_redis, cached):
+    def update(cursor, params):
+        cursor.rowcount = 1
+        for var, value in zip(params[4:], ('Dune', 'Herbert', 5)):
+            var.setvalue(0, [value])
+    fake_db.on(SQL_UPDATE_BOOK, update)
+
+    response = client.put('/api/v1/books/7', json={'quantity': 5})
+
+    assert response.status_code == 200
+    assert dropped(fake_redis, cached) == BOOK_KEYS | {BOOK_PAGES_KEY} | HISTORY_KEYS
+
+
+def test_delete_book_drops_the_book_its_pages_and_history(client, fake_db, fake_redis, cached):
+    fake_db.on(SQL_DELETE_BOOK, rowcount(1))
+
+    response = client.delete('/api/v1/books/7')
+
+    assert response.status_code == 200
+    assert dropped(fake_redis, cached) == BOOK_KEYS | {BOOK_PAGES_KEY} | HISTORY_KEYS
+
+
+def test_missing_book_keeps_every_cache(client, fake_db, fake_redis, cached):
+    fake_db.on(SQL_DELETE_BOOK, rowcount(0))
+
+    response = client.delete('/api/v1/books/7')
+
+    assert response.status_code == 404
+    assert dropped(fake_redis, cached) == set()
+
+
+@pytest.mark.parametrize('path, sql, outcome', [
+    ('/api/v1/borrow', SQL_BORROW_BOOK, {'title': 'Dune', 'borrowed': 1, 'user_count': 1, 'quantity': 1}),
+    ('/api/v2/borrow', SQL_BORROW_BOOK, {'title': 'Dune', 'borrowed': 1, 'user_count': 1, 'quantity': 1}),
+    ('/api/v1/return', SQL_RETURN_BOOK, {'title': 'Dune', 'returned': 1}),
+    ('/api/v2/return', SQL_RETURN_BOOK, {'title': 'Dune', 'returned': 1}),
+])
+def test_borrow_and_return_drop_the_book_and_history(client, fake_db, fake_redis, cached, path, sql, outcome):
+    def handler(cursor, params):
+        for name, value in outcome.items():
+            params[name].setvalue(0, value)
+    fake_db.on(sql, handler)
+
+    response = client.post(path, json={'user_id': 3, 'book_id': 7})
+
+    assert response.status_code == 200
+    assert dropped(fake_redis, cached) == BOOK_KEYS | {BOOK_PAGES_KEY} | HISTORY_KEYS
+
+
+def test_refused_borrow_keeps_every_cache(client, fake_db, fake_redis, cached):
+    def out_of_stock(cursor, params):
+        params['borrowed'].setvalue(0, 0)
+        params['user_count'].setvalue(0, 1)
+        params['quantity'].setvalue(0, 0)
+    fake_db.on(SQL_BORROW_BOOK, out_of_stock)
+
+    response = client.post('/api/v1/borrow', json={'user_id': 3, 'book_id': 7})
+
+    assert response.status_code == 400
+    assert dropped(fake_redis, cached) == set()
+
+
+@pytest.mark.parametrize('prefix', ['/api/v1', '/api/v2'])
+def test_add_user_drops_only_the_user_pages(client, fake_db, fake_redis, cached, prefix):
+    fake_db.on(SQL_INSERT_USER, lambda cursor, params: params['new_id'].setvalue(0, 4))
+
+    response = client.post(prefix + '/users', json={'name': 'Grace'})
+
+    assert response.status_code == 201
+    assert dropped(fake_redis, cached) == {USER_PAGES_KEY}
+
+
+@pytest.mark.parametrize('prefix', ['/api/v1', '/api/v2'])
+def test_register_drops_only_the_user_pages(client, fake_db, fake_redis, cached, prefix):
+    fake_db.on(SQL_REGISTER_USER, rowcount(1))
+
+    response = client.post(prefix + '/register',
+                           json={'name': 'Grace', 'email': 'grace@example.com', 'password': 'hopper'})
+
+    assert response.status_code == 201
+    assert dropped(fake_redis, cached) == {USER_PAGES_KEY}
+
+
+@pytest.mark.parametrize('prefix', ['/api/v1', '/api/v2'])
+def test_update_user_drops_the_user_its_pages_and_history(client, fake_db, fake_redis, cached, prefix):
+    def update(cursor, params):
+        params['name_out'].setvalue(0, 'Ada L.')
+        params['email_out'].setvalue(0, 'ada@example.com')
+        params['updated'].setvalue(0, 1)
+    fake_db.on(SQL_UPDATE_USER, update)
+
+    response = client.put(prefix + '/users/3', json={'name': 'Ada L.'})
+
+    assert response.status_code == 200
+    assert dropped(fake_redis, cached) == USER_KEYS | {USER_PAGES_KEY} | HISTORY_KEYS
+
+
+@pytest.mark.parametrize('prefix', ['/api/v1', '/api/v2'])
+def test_delete_user_drops_the_user_its_pages_and_history(client, fake_db, fake_redis, cached, prefix):
+    fake_db.on(SQL_DELETE_USER, rowcount(1))
+
+    response = client.delete(prefix + '/users/3')
+
+    assert response.status_code == 200
+    assert dropped(fake_redis, cached) == USER_KEYS | {USER_PAGES_KEY} | HISTORY_KEYS
+
+
+def test_new_user_shows_up_on_the_next_list_read(client, fake_db):
+    fake_db.rows(SQL_LIST_USERS, ('id', 'name', 'email', 'total_items'), [(3, 'Ada', 'ada@example.com', 1)])
+    fake_db.on(SQL_INSERT_USER, lambda cursor, params: params['new_id'].setvalue(0, 4))
+    client.get('/api/v1/users')
+
+    client.post('/api/v1/users', json={'name': 'Grace'})
+    fake_db.rows(SQL_LIST_USERS, ('id', 'name', 'email', 'total_items'),
+                 [(3, 'Ada', 'ada@example.com', 2), (4, 'Grace', None, 2)])
+    response = client.get('/api/v1/users')
+
+    assert response.get_json()['total_items'] == 2
+    assert fake_db.count(SQL_LIST_USERS) == 2
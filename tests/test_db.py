@@ -0,0 +1,37 @@
+import pytest
+
+from api_endpoint import create_app
+
+
+def build(monkeypatch, schema):
+    if schema is None:
+        monkeypatch.delenv('DB_SCHEMA', raising=False)
+    else:
+        monkeypatch.setenv('DB_SCHEMA', schema)
+    return create_app({'TESTING': True, 'SERVER_NAME': None})
+
+
+def test_no_session_callback_without_db_schema(monkeypatch, fake_db, fake_redis):
+    build(monkeypatch, None)
+
+    assert fake_db.pool_kwargs['session_callback'] is None
+
+
+def test_db_schema_switches_each_new_session(monkeypatch, fake_db, fake_redis):
+    statement = 'ALTER SESSION SET CURRENT_SCHEMA = "LIBRARY_OWNER"'
+    fake_db.on(statement, lambda cursor, params: None)
+    app = build(monkeypatch, 'library_owner')
+
+    callback = fake_db.pool_kwargs['session_callback']
+    callback(app.pool.acquire(), None)
+
+    assert fake_db.count(statement) == 1
+
+
+@pytest.mark.parametrize('schema', ['LIBRARY"; DROP TABLE books; --', '1library', 'library owner', 'library\n'])
+def test_invalid_db_schema_is_refused_before_connecting(monkeypatch, fake_db, fake_redis, schema):
+    with pytest.raises(RuntimeError, match='DB_SCHEMA'):
+        build(monkeypatch, schema)
+
+    assert fake_db.pool_kwargs is None
+
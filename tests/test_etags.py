@@ -0,0 +1,201 @@
+import flask_compress.flask_compress
+import pytest
+
+from api_endpoint.sql import SQL_GET_BOOK, SQL_GET_USER, SQL_LIST_BOOKS_JSON, SQL_LIST_USERS, SQL_BORROW_HISTORY
+
+BOOK_ROW = ('id', 'title', 'author', 'quantity', 'ora_rowscn')
+USER_ROW = ('id', 'name', 'email', 'ora_rowscn')
+
+
+def test_book_etag_answers_304_from_the_cache(client, fake_db):
+    fake_db.rows(SQL_GET_BOOK, BOOK_ROW, [(7, 'Dune', 'Herbert', 2, 1001)])
+
+    first = client.get('/api/v1/books/7')
+    etag = first.headers['ETag']
+    assert first.status_code == 200
+    assert first.headers['Cache-Control'] == 'private, max-age=60'
+    assert first.get_json()['title'] == 'Dune'
+
+    again = client.get('/api/v1/books/7', headers={'If-None-Match': etag})
+    assert again.status_code == 304
+    assert again.data == b''
+    assert again.headers['ETag'] == etag
+    # The revalidation was answered from the cached ETag alone
+    assert fake_db.count(SQL_GET_BOOK) == 1
+
+
+def test_book_etag_is_checked_against_the_row_scn_on_a_cache_miss(client, fake_db, fake_redis):
+    fake_db.rows(SQL_GET_BOOK, BOOK_ROW, [(7, 'Dune', 'Herbert', 2, 1001)])
+    etag = client.get('/api/v1/books/7').headers['ETag']
+    fake_redis.data.clear()
+
+    response = client.get('/api/v1/books/7', headers={'If-None-Match': etag})
+
+    assert response.status_code == 304
+    assert fake_db.count(SQL_GET_BOOK) == 2
+
+
+def test_book_etag_changes_with_the_row(client, fake_db, fake_redis):
+    fake_db.rows(SQL_GET_BOOK, BOOK_ROW, [(7, 'Dune', 'Herbert', 2, 1001)])
+    old_etag = client.get('/api/v1/books/7').headers['ETag']
+    fake_redis.data.clear()
+    fake_db.rows(SQL_GET_BOOK, BOOK_ROW, [(7, 'Dune', 'Herbert', 1, 1002)])
+
+    response = client.get('/api/v1/books/7', headers={'If-None-Match': old_etag})
+
+    assert response.status_code == 200
+    assert response.headers['ETag'] != old_etag
+    assert response.get_json()['quantity'] == 1
+
+
+def test_user_etag_answers_304(client, fake_db):
+    fake_db.rows(SQL_GET_USER, USER_ROW, [(3, 'Ada', 'ada@example.com', 2001)])
+
+    etag = client.get('/api/v1/users/3').headers['ETag']
+    response = client.get('/api/v1/users/3', headers={'If-None-Match': etag})
+
+    assert response.status_code == 304
+    assert response.headers['ETag'] == etag
+
+
+def test_book_list_page_answers_304(client, fake_db):
+    fake_db.rows(SQL_LIST_BOOKS_JSON, ('data', 'total_items'),
+                 [('[{"id":7,"title":"Dune","author":"Herbert","quantity":2}]', 1)])
+
+    first = client.get('/api/v1/books?page=1&limit=10')
+    etag = first.headers['ETag']
+    assert first.status_code == 200
+    assert first.get_json()['total_items'] == 1
+    assert first.get_json()['data'][0]['title'] == 'Dune'
+
+    again = client.get('/api/v1/books?page=1&limit=10', headers={'If-None-Match': etag})
+    assert again.status_code == 304
+    assert again.headers['ETag'] == etag
+    assert again.headers['Cache-Control'] == 'public, max-age=300'
+    assert fake_db.count(SQL_LIST_BOOKS_JSON) == 1
+
+
+def test_user_list_page_answers_304(client, fake_db):
+    fake_db.rows(SQL_LIST_USERS, ('id', 'name', 'email', 'total_items'), [(3, 'Ada', 'ada@example.com', 1)])
+
+    etag = client.get('/api/v1/users').headers['ETag']
+    response = client.get('/api/v1/users', headers={'If-None-Match': etag})
+
+    assert response.status_code == 304
+    assert fake_db.count(SQL_LIST_USERS) == 1
+
+
+def test_user_list_pages_are_cached_per_version(client, fake_db):
+    fake_db.rows(SQL_LIST_USERS, ('id', 'name', 'email', 'total_items'), [(3, 'Ada', 'ada@example.com', 1)])
+
+    v1 = client.get('/api/v1/users')
+    v2 = client.get('/api/v2/users')
+
+    assert v1.status_code == v2.status_code == 200
+    # Each version built its own page instead of serving the other's body
+    assert fake_db.count(SQL_LIST_USERS) == 2
+
+
+def test_history_answers_304(client, fake_db):
+    fake_db.rows(SQL_BORROW_HISTORY, ('history',), [(None,)])
+
+    first = client.get('/api/v1/borrow/history')
+    assert first.status_code == 200
+    assert first.get_json() == []
+    assert first.headers['Cache-Control'] == 'private, max-age=60'
+
+    again = client.get('/api/v1/borrow/history', headers={'If-None-Match': first.headers['ETag']})
+    assert again.status_code == 304
+    assert fake_db.count(SQL_BORROW_HISTORY) == 1
+
+
+# --- Compressed responses: Flask-Compress sends their ETag as "<etag>:gzip" ---
+
+GZIP = {'Accept-Encoding': 'gzip'}
+LONG_TITLE = 'The Collected Letters of ' * 40
+
+
+@pytest.fixture
+def gzipped(monkeypatch):
+    """Counts the bodies Flask-Compress compresses, i.e. the 200s that were built in full."""
+    calls = []
+    compress = flask_compress.flask_compress._compress_data
+
+    def counting(app, data, algorithm):
+        calls.append(len(data))
+        return compress(app, data, algorithm)
+
+    monkeypatch.setattr(flask_compress.flask_compress, '_compress_data', counting)
+    return calls
+
+
+def revalidate(client, url, etag):
+    return client.get(url, headers={**GZIP, 'If-None-Match': etag})
+
+
+def test_gzip_book_revalidation_is_answered_from_the_cached_etag(client, fake_db, gzipped):
+    fake_db.rows(SQL_GET_BOOK, BOOK_ROW, [(7, LONG_TITLE, 'Various', 2, 1001)])
+
+    first = client.get('/api/v1/books/7', headers=GZIP)
+    etag = first.headers['ETag']
+    assert first.headers['Content-Encoding'] == 'gzip'
+    assert etag.endswith(':gzip"')
+
+    again = revalidate(client, '/api/v1/books/7', etag)
+
+    assert again.status_code == 304
+    assert again.headers['ETag'] == etag
+    assert fake_db.count(SQL_GET_BOOK) == 1
+    assert len(gzipped) == 1
+
+
+def test_gzip_book_revalidation_on_a_cache_miss_builds_no_body(client, fake_db, fake_redis, gzipped):
+    fake_db.rows(SQL_GET_BOOK, BOOK_ROW, [(7, LONG_TITLE, 'Various', 2, 1001)])
+    etag = client.get('/api/v2/books/7', headers=GZIP).headers['ETag']
+    fake_redis.data.clear()
+
+    response = revalidate(client, '/api/v2/books/7', etag)
+
+    assert response.status_code == 304
+    assert response.headers['ETag'] == etag
+    assert len(gzipped) == 1
+
+
+def test_gzip_user_revalidation_builds_no_body(client, fake_db, gzipped):
+    fake_db.rows(SQL_GET_USER, USER_ROW, [(3, LONG_TITLE, 'ada@example.com', 2001)])
+    etag = client.get('/api/v1/users/3', headers=GZIP).headers['ETag']
+
+    response = revalidate(client, '/api/v1/users/3', etag)
+
+    assert response.status_code == 304
+    assert fake_db.count(SQL_GET_USER) == 1
+    assert len(gzipped) == 1
+
+
+@pytest.mark.parametrize('url, sql, columns, row', [
+    ('/api/v1/books', SQL_LIST_BOOKS_JSON, ('data', 'total_items'),
+     (f'[{{"id":7,"title":"{LONG_TITLE}","author":"Various","quantity":2}}]', 1)),
+    ('/api/v1/users', SQL_LIST_USERS, ('id', 'name', 'email', 'total_items'),
+     (3, LONG_TITLE, 'ada@example.com', 1)),
+], ids=['books', 'users'])
+def test_gzip_list_revalidation_builds_no_body(client, fake_db, gzipped, url, sql, columns, row):
+    fake_db.rows(sql, columns, [row])
+    first = client.get(url, headers=GZIP)
+    assert first.headers['Content-Encoding'] == 'gzip'
+
+    again = revalidate(client, url, first.headers['ETag'])
+
+    assert again.status_code == 304
+    assert again.headers['ETag'] == first.headers['ETag']
+    assert fake_db.count(sql) == 1
+    assert len(gzipped) == 1
+
+
+def test_if_none_match_lists_and_weak_validators_match(client, fake_db):
+    fake_db.rows(SQL_GET_BOOK, BOOK_ROW, [(7, 'Dune', 'Herbert', 2, 1001)])
+    etag = client.get('/api/v1/books/7').headers['ETag']
+
+    response = client.get('/api/v1/books/7', headers={'If-None-Match': f'"stale", W/{etag}'})
+
+    assert response.status_code == 304
+    assert response.headers['ETag'] == etag
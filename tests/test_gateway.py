@@ -0,0 +1,132 @@
+import importlib.util
+import os
+import time
+
+import jwt
+import pytest
+import requests
+
+GATEWAY_PATH = os.path.join(os.path.dirname(__file__), os.pardir, 'authentication-gateway', 'app.py')
+FORWARD_URL = 'http://library-api:5000'
+
+
+@pytest.fixture(scope='module')
+def gateway():
+    """Imports authentication-gateway/app.py, which reads its settings at import time."""
+    os.environ.setdefault('FORWARD_URL', FORWARD_URL)
+    spec = importlib.util.spec_from_file_location('gateway_app', GATEWAY_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class UpstreamResponse:
+    """What SESSION.request(..., stream=True) hands back: status, raw headers and raw body."""
+
+    def __init__(self, status_code=200, body=b'{"ok":true}', headers=None):
+        self.status_code = status_code
+        self.raw = self
+        self.headers = headers or {'Content-Type': 'application/json', 'Content-Length': str(len(body))}
+        self._body = body
+
+    def stream(self, chunk_size, decode_content=True):
+        yield self._body
+
+
+@pytest.fixture
+def upstream(gateway, monkeypatch):
+    """Records every forwarded request instead of opening a connection."""
+    calls = []
+
+    def request(**kwargs):
+        calls.append(kwargs)
+        return UpstreamResponse()
+
+    monkeypatch.setattr(gateway.SESSION, 'request', request)
+    gateway._decode_cached.cache_clear()
+    return calls
+
+
+@pytest.fixture
+def client(gateway):
+    return gateway.app.test_client()
+
+
+def token(key=None, algorithm='HS256', expires_in=3600, **claims):
+    claims.setdefault('sub', '3')
+    claims['exp'] = int(time.time()) + expires_in
+    return jwt.encode(claims, key or os.environ['SECRET_KEY'], algorithm=algorithm)
+
+
+def bearer(value):
+    return {'Authorization': f'Bearer {value}'}
+
+
+def test_valid_token_is_forwarded(client, upstream):
+    auth = bearer(token())
+
+    response = client.get('/api/v1/books?page=2', headers=auth)
+
+    assert response.status_code == 200
+    assert response.data == b'{"ok":true}'
+    call, = upstream
+    assert call['method'] == 'GET'
+    assert call['url'] == f'{FORWARD_URL}/api/v1/books'
+    assert call['params'].to_dict() == {'page': '2'}
+    assert call['headers']['Authorization'] == auth['Authorization']
+    assert 'Host' not in call['headers']
+
+
+def test_public_paths_need_no_token(client, upstream):
+    response = client.post('/api/v1/login', json={'email': 'ada@example.com', 'password': 'x'})
+
+    assert response.status_code == 200
+    assert len(upstream) == 1
+
+
+@pytest.mark.parametrize('headers', [
+    {},
+    {'Authorization': 'Token abc'},
+    bearer('not-a-jwt'),
+    bearer(token(key='some-other-secret-that-is-long-enough')),
+    bearer(token(algorithm='HS512')),
+    bearer(jwt.encode({'sub': '3'}, None, algorithm='none')),
+], ids=['missing', 'not-bearer', 'malformed', 'bad-signature', 'wrong-alg', 'unsigned'])
+def test_invalid_tokens_are_rejected(client, upstream, headers):
+    response = client.get('/api/v1/books', headers=headers)
+
+    assert response.status_code == 401
+    assert response.get_json()['message'].startswith('Token invalid:')
+    assert upstream == []
+
+
+def test_expired_token_is_rejected(client, upstream):
+    response = client.get('/api/v1/books', headers=bearer(token(expires_in=-10)))
+
+    assert response.status_code == 401
+    assert response.get_json()['message'].startswith('Token expired:')
+    assert upstream == []
+
+
+def test_cached_token_is_rejected_once_it_expires(gateway, client, upstream, monkeypatch):
+    auth = bearer(token(expires_in=60))
+    assert client.get('/api/v1/books', headers=auth).status_code == 200
+
+    later = time.time() + 120
+    monkeypatch.setattr(gateway.time, 'time', lambda: later)
+    response = client.get('/api/v1/books', headers=auth)
+
+    assert response.status_code == 401
+    assert response.get_json()['message'].startswith('Token expired:')
+    assert len(upstream) == 1
+
+
+def test_unreachable_upstream_is_a_503(gateway, client, monkeypatch):
+    def refuse(**kwargs):
+        raise requests.exceptions.ConnectionError('connection refused')
+    monkeypatch.setattr(gateway.SESSION, 'request', refuse)
+
+    response = client.get('/health')
+
+    assert response.status_code == 503
+    assert response.get_json()['message'] == 'Error connecting to the upstream service'
@@ -0,0 +1,121 @@
+import oracledb
+import pytest
+
+from api_endpoint.sql import SQL_BORROW_BOOK, SQL_RETURN_BOOK
+
+VERSIONS = pytest.mark.parametrize('prefix', ['/api/v1', '/api/v2'])
+
+
+def borrow_outcome(title=None, borrowed=0, user_count=1, quantity=None):
+    """Handler setting SQL_BORROW_BOOK's OUT binds the way the PL/SQL block would."""
+    def handler(cursor, params):
+        params['title'].setvalue(0, title)
+        params['borrowed'].setvalue(0, borrowed)
+        params['user_count'].setvalue(0, user_count)
+        params['quantity'].setvalue(0, quantity)
+    return handler
+
+
+def return_outcome(title=None, returned=0):
+    """Handler setting SQL_RETURN_BOOK's OUT binds the way the PL/SQL block would."""
+    def handler(cursor, params):
+        params['title'].setvalue(0, title)
+        params['returned'].setvalue(0, returned)
+    return handler
+
+
+def post_borrow(client, prefix, path='/borrow', body=None):
+    return client.post(prefix + path, json=body if body is not None else {'user_id': 1, 'book_id': 7})
+
+
+@VERSIONS
+def test_borrow_succeeds(client, fake_db, prefix):
+    fake_db.on(SQL_BORROW_BOOK, borrow_outcome(title='Dune', borrowed=1, quantity=2))
+
+    response = post_borrow(client, prefix)
+
+    assert response.status_code == 200
+    assert response.get_json() == {"message": "Successfully borrowed 'Dune'"}
+    assert fake_db.count(SQL_BORROW_BOOK) == 1
+
+
+@VERSIONS
+def test_borrow_unknown_user(client, fake_db, prefix):
+    fake_db.on(SQL_BORROW_BOOK, borrow_outcome(user_count=0, quantity=2))
+
+    response = post_borrow(client, prefix)
+
+    assert response.status_code == 404
+    assert response.get_json() == {"error": "User not found"}
+
+
+@VERSIONS
+def test_borrow_unknown_book(client, fake_db, prefix):
+    fake_db.on(SQL_BORROW_BOOK, borrow_outcome(quantity=None))
+
+    response = post_borrow(client, prefix)
+
+    assert response.status_code == 404
+    assert response.get_json() == {"error": "Book not found"}
+
+
+@VERSIONS
+def test_borrow_out_of_stock(client, fake_db, prefix):
+    fake_db.on(SQL_BORROW_BOOK, borrow_outcome(title='Dune', quantity=0))
+
+    response = post_borrow(client, prefix)
+
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "Book is out of stock"}
+
+
+@VERSIONS
+def test_borrow_database_error_rolls_back(client, fake_db, prefix):
+    def fail(cursor, params):
+        raise oracledb.DatabaseError("ORA-00060: deadlock detected")
+    fake_db.on(SQL_BORROW_BOOK, fail)
+
+    response = post_borrow(client, prefix)
+
+    assert response.status_code == 500
+    assert response.get_json()["error"].startswith("Database error:")
+    assert fake_db.rollbacks == 1
+
+
+@VERSIONS
+def test_borrow_rejects_missing_fields_before_the_database(client, fake_db, prefix):
+    response = post_borrow(client, prefix, body={'user_id': 1})
+
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "Missing user_id or book_id"}
+    assert fake_db.count(SQL_BORROW_BOOK) == 0
+
+
+@VERSIONS
+def test_return_succeeds(client, fake_db, prefix):
+    fake_db.on(SQL_RETURN_BOOK, return_outcome(title='Dune', returned=1))
+
+    response = post_borrow(client, prefix, '/return')
+
+    assert response.status_code == 200
+    assert response.get_json() == {"message": "Successfully returned 'Dune'"}
+
+
+@VERSIONS
+def test_return_of_a_deleted_book_names_it_unknown(client, fake_db, prefix):
+    fake_db.on(SQL_RETURN_BOOK, return_outcome(title=None, returned=1))
+
+    response = post_borrow(client, prefix, '/return')
+
+    assert response.status_code == 200
+    assert response.get_json() == {"message": "Successfully returned 'Unknown Book'"}
+
+
+@VERSIONS
+def test_return_without_active_borrow(client, fake_db, prefix):
+    fake_db.on(SQL_RETURN_BOOK, return_outcome(returned=0))
+
+    response = post_borrow(client, prefix, '/return')
+
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "No active borrow record found for this user and book"}